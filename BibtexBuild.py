@@ -0,0 +1,192 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from BibtexWriter import iter_serialize
+
+tex_template = (
+    '\\documentclass{article}\n\n'
+    '\\usepackage[utf8]{inputenc}\n\\usepackage[T1]{fontenc}\n\\usepackage[english]{babel}\n\\usepackage{amsmath,amssymb}\n'
+    '\\usepackage{xcolor}\n\\usepackage[backend=biber,sorting=none,style=reading]{biblatex}\n\\usepackage{hyperref}\n'
+    '\\usepackage[margin=2cm, includefoot]{geometry}\n\n'
+    '\\addbibresource[]{references.bib}\n\n'
+    '\\hypersetup{\n\tcolorlinks,\n\tcitecolor = black,\n\tfilecolor = black,\n\turlcolor = blue!50!black,\n\tpdfstartview = FitH\n}\n\n'
+    '\\begin{document}\n\t\\nocite{*}\n\t\\printbibliography\n\\end{document}\n'
+)
+
+regex_unsafe = re.compile(r'[^\w.-]+')
+
+
+class BibtexBuilder:
+    # Renders entries as a PDF bibliography. Every build runs in its own temporary directory, so builds can
+    # run at the same time. pdflatex is run again only while its .aux changes or biber produced a new .bbl,
+    # at most max_latex_runs times, and biber only when the .bcf changed. PDFs are cached in cache_dir by
+    # the hash of the document, the bibliography and the commands, so rebuilding an unchanged bibliography
+    # only copies the cached PDF. The least recently used PDFs are removed once the cache exceeds max_size.
+    # runs lists the commands run by this builder, including those run in the processes of build_many.
+    def __init__(self, cache_dir=None, pdflatex='pdflatex', biber='biber', max_latex_runs=4, template=tex_template,
+                 max_size=512 << 20):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.environ.get('BIBTEXPARSER_CACHE_DIR',
+                                                    os.path.join(os.path.expanduser('~'), '.cache', 'bibtexparser')), 'pdf')
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.pdflatex = pdflatex
+        self.biber = biber
+        self.max_latex_runs = max_latex_runs
+        self.template = template
+        self.runs = []
+
+    def build(self, entries, output_filename: str):
+        # writes output_filename (its extension is replaced by .pdf) and returns True if a PDF was created,
+        # otherwise an existing output_filename is removed
+        output_filename = os.path.splitext(output_filename)[0] + '.pdf'
+        bib = ''.join(iter_serialize(entries))
+        cached_filename = os.path.join(self.cache_dir, self.get_hash(bib) + '.pdf')
+        output_dir = os.path.dirname(output_filename)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        try:
+            # the modification time of a cached PDF is the time it was last used
+            os.utime(cached_filename)
+            _copy_atomic(cached_filename, output_filename)
+            return True
+        except FileNotFoundError:
+            pass
+        with tempfile.TemporaryDirectory(prefix='bibtex_build') as build_dir:
+            pdf = self._compile(build_dir, bib)
+            if pdf is None:
+                self._remove(output_filename)
+                return False
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _copy_atomic(pdf, cached_filename)
+        _copy_atomic(cached_filename, output_filename)
+        self.evict(keep=cached_filename)
+        return True
+
+    def build_many(self, jobs, workers=None):
+        # jobs maps output filenames to entries; the builds run in a pool of workers processes
+        jobs = list(jobs.items()) if isinstance(jobs, dict) else list(jobs)
+        if workers == 1 or len(jobs) <= 1:
+            return {output_filename: self.build(entries, output_filename) for output_filename, entries in jobs}
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for (output_filename, _), (result, runs) in zip(jobs, executor.map(
+                    _build, [(self, list(entries), output_filename) for output_filename, entries in jobs])):
+                results[output_filename] = result
+                self.runs += runs
+        return results
+
+    def build_grouped(self, entries, field: str, output_pattern: str, workers=None):
+        # one PDF per content of field, e.g. per year or author; output_pattern holds {} for the content
+        groups = {}
+        for entry in entries:
+            if field == 'type':
+                groups.setdefault(entry.type.lower(), []).append(entry)
+            elif entry.has_field(field):
+                groups.setdefault(entry.get_field(field), []).append(entry)
+        jobs = {output_pattern.format(regex_unsafe.sub('_', content).strip('_') or '_'): group for content, group in groups.items()}
+        return self.build_many(jobs, workers)
+
+    def evict(self, keep=None):
+        # removes the least recently used PDFs until the total size is below max_size
+        files, total = [], 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.pdf'): continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_size: break
+            if path == keep: continue
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir): return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pdf'):
+                self._remove(entry.path)
+
+    def get_hash(self, bib: str):
+        digest = hashlib.sha256()
+        for part in (self.template, bib, self.pdflatex, self.biber):
+            digest.update(part.encode('utf8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _compile(self, build_dir, bib):
+        with open(os.path.join(build_dir, 'references.bib'), 'w', encoding='utf8') as file:
+            file.write(bib)
+        with open(os.path.join(build_dir, 'document.tex'), 'w', encoding='utf8') as file:
+            file.write(self.template)
+        aux, bcf, bbl = None, None, None
+        for run in range(self.max_latex_runs):
+            if self._run(build_dir, [self.pdflatex, '-interaction=nonstopmode', '-halt-on-error', 'document.tex']) != 0:
+                return None
+            new_aux = _hash_file(os.path.join(build_dir, 'document.aux'))
+            new_bcf = _hash_file(os.path.join(build_dir, 'document.bcf'))
+            if new_bcf != bcf:
+                # biber only reads the .bcf (and the .bib), so it only runs again if pdflatex changed that
+                if self._run(build_dir, [self.biber, 'document']) != 0:
+                    return None
+                bcf = new_bcf
+            new_bbl = _hash_file(os.path.join(build_dir, 'document.bbl'))
+            if run > 0 and new_aux == aux and new_bbl == bbl:
+                # the last pdflatex run read the current .bbl and did not change its .aux
+                break
+            aux, bbl = new_aux, new_bbl
+        pdf = os.path.join(build_dir, 'document.pdf')
+        return pdf if os.path.isfile(pdf) else None
+
+    def _run(self, build_dir, command):
+        self.runs.append(os.path.basename(command[0]))
+        return subprocess.run(command, cwd=build_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL).returncode
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _build(job):
+    # the builder is a copy in the worker process, so its runs are sent back with the result
+    builder, entries, output_filename = job
+    builder.runs = []
+    return builder.build(entries, output_filename), builder.runs
+
+
+def _hash_file(filename: str):
+    try:
+        with open(filename, 'rb') as file:
+            return hashlib.sha256(file.read()).digest()
+    except OSError:
+        return None
+
+
+def _copy_atomic(source: str, destination: str):
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(destination)), suffix='.tmp')
+    os.close(fd)
+    try:
+        # mkstemp creates the file readable by the owner only
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_filename, 0o666 & ~umask)
+        shutil.copyfile(source, tmp_filename)
+        os.replace(tmp_filename, destination)
+    except BaseException:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
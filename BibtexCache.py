@@ -0,0 +1,150 @@
+import os
+import struct
+import marshal
+import hashlib
+import tempfile
+from BibtexEntry import BibtexEntry
+
+
+class BibtexCache:
+    # A cache file starts with a header holding the format version, the size, modification time and
+    # SHA-256 of the parsed file and the SHA-256 of the rest of the cache file, the marshalled (key, type,
+    # field names, contents) of all entries. A cache is used when size and modification time match, or when
+    # only the modification time changed but the content hash is still the same. A cache file whose entries
+    # do not match their hash is removed.
+    magic = b'BIBC'
+    version = 2
+    header = struct.Struct('<4sHHQq32s32s')
+    extension = '.bibcache'
+
+    def __init__(self, directory=None, max_size=512 << 20):
+        if directory is None:
+            directory = os.environ.get('BIBTEXPARSER_CACHE_DIR',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'bibtexparser'))
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get_cache_filename(self, filename: str):
+        name = hashlib.sha1(os.path.abspath(filename).encode('utf8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.directory, name + self.extension)
+
+    def load(self, filename: str):
+        entries = self._load(filename)
+        if entries is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entries
+
+    def _load(self, filename: str):
+        cache_filename = self.get_cache_filename(filename)
+        try:
+            with open(cache_filename, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        try:
+            magic, version, marshal_version, size, mtime, digest, payload_digest = self.header.unpack_from(data)
+            if magic != self.magic or version != self.version or marshal_version != marshal.version:
+                return None
+            stat = os.stat(filename)
+            if size != stat.st_size:
+                return None
+            if mtime != stat.st_mtime_ns and digest != self.hash_file(filename):
+                return None
+            payload = memoryview(data)[self.header.size:]
+            if payload_digest != hashlib.sha256(payload).digest():
+                self._remove(cache_filename)
+                return None
+            if mtime != stat.st_mtime_ns:
+                self._write_header(cache_filename, data, stat)
+            entries = [BibtexEntry.from_state(state) for state in marshal.loads(payload)]
+        except (ValueError, EOFError, TypeError, IndexError, struct.error):
+            self._remove(cache_filename)
+            return None
+        try:
+            os.utime(cache_filename)
+        except OSError:
+            pass
+        return entries
+
+    def store(self, filename: str, entries, stat=None, digest=None):
+        # stat and digest should be taken before the file was parsed, in case it changes meanwhile
+        if stat is None:
+            stat = os.stat(filename)
+        if digest is None:
+            digest = self.hash_file(filename)
+        states = []
+        for entry in entries:
+            items = tuple(entry.field_items())
+            states.append((entry.key, entry.type, tuple([item[0] for item in items]), tuple([item[1] for item in items])))
+        payload = marshal.dumps(states)
+        data = self.header.pack(self.magic, self.version, marshal.version, stat.st_size, stat.st_mtime_ns, digest,
+                                hashlib.sha256(payload).digest()) + payload
+        os.makedirs(self.directory, exist_ok=True)
+        cache_filename = self.get_cache_filename(filename)
+        self._write_atomic(cache_filename, data)
+        self.evict(keep=cache_filename)
+
+    def evict(self, keep=None):
+        # removes the least recently used cache files until the total size is below max_size
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.extension): continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_size: break
+            if path == keep: continue
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory): return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.extension):
+                self._remove(entry.path)
+
+    @staticmethod
+    def hash_file(filename: str):
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as file:
+            while True:
+                chunk = file.read(1 << 20)
+                if not chunk: break
+                digest.update(chunk)
+        return digest.digest()
+
+    def _write_header(self, cache_filename, data, stat):
+        # the file was touched but not changed, so the cache only gets the new modification time
+        magic, version, marshal_version, size, _, digest, payload_digest = self.header.unpack_from(data)
+        header = self.header.pack(magic, version, marshal_version, size, stat.st_mtime_ns, digest, payload_digest)
+        try:
+            self._write_atomic(cache_filename, header + data[self.header.size:])
+        except OSError:
+            pass
+
+    def _write_atomic(self, cache_filename, data):
+        fd, tmp_filename = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_filename, cache_filename)
+        except BaseException:
+            self._remove(tmp_filename)
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,101 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# comments are matched as well, so that citations in them are skipped
+regex_citation = re.compile(r'(?<!\\)%.*|\\(?:no)?cite\w*\*?(?:\s*\[[^\]]*\])*\s*\{(?P<keys>(?!\*)[^{}]+)\}')
+
+
+def scan_file(filename: str):
+    # returns the keys cited in filename in the order of their first citation, files that are not
+    # valid utf8 are skipped
+    try:
+        with open(filename, 'r', encoding='utf8') as file:
+            text = file.read()
+    except UnicodeDecodeError:
+        return ()
+    keys = {}
+    for match in regex_citation.finditer(text):
+        matched_keys = match.group('keys')
+        if not matched_keys: continue
+        for key in matched_keys.split(','):
+            keys[key.strip()] = None
+    return tuple(keys)
+
+
+def find_files(folders, include_subfolders=False, file_extensions=None):
+    if file_extensions is None:
+        file_extensions = ['.tex']
+    files = []
+    def _scan_folder(folder):
+        # same order as os.walk, the files of a folder come before those of its subfolders
+        subfolders = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if include_subfolders and not entry.is_symlink():
+                        subfolders.append(entry.path)
+                elif os.path.splitext(entry.name)[1] in file_extensions:
+                    files.append(entry.path)
+        for subfolder in subfolders:
+            _scan_folder(subfolder)
+    for folder in folders:
+        _scan_folder(folder)
+    return files
+
+
+class CitationScanner:
+    # Scans files for citations, reading and matching up to workers files at once in threads or, with
+    # use_processes, in processes. The keys of every file are cached together with its modification
+    # time and size, so repeated scans only read the files that changed.
+    def __init__(self, workers=None, use_processes=False):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.cache = {}
+        self.files_scanned = 0
+        self.cache_hits = 0
+
+    def scan(self, files):
+        # returns a tuple of cited keys for every file, files that do not exist are left empty
+        results = [()] * len(files)
+        todo = []
+        for idx, filename in enumerate(files):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            if not os.path.isfile(filename): continue
+            cached = self.cache.get(filename)
+            if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                results[idx] = cached[2]
+                self.cache_hits += 1
+            else:
+                todo.append((idx, filename, stat))
+        for (idx, filename, stat), keys in zip(todo, self._scan_files([filename for _, filename, _ in todo])):
+            if keys is None:
+                self.cache.pop(filename, None)
+                continue
+            self.cache[filename] = (stat.st_mtime_ns, stat.st_size, keys)
+            results[idx] = keys
+        self.files_scanned += len(todo)
+        return results
+
+    def scan_folders(self, folders, include_subfolders=False, file_extensions=None):
+        return self.scan(find_files(folders, include_subfolders, file_extensions))
+
+    def _scan_files(self, files):
+        if len(files) <= 1 or self.workers == 1:
+            return [_scan_file_or_none(filename) for filename in files]
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            return list(executor.map(_scan_file_or_none, files, chunksize=16 if self.use_processes else 1))
+
+    def clear(self):
+        self.cache = {}
+
+
+def _scan_file_or_none(filename: str):
+    try:
+        return scan_file(filename)
+    except OSError:
+        return None
@@ -0,0 +1,427 @@
+from array import array
+from collections import Counter
+from collections.abc import MutableMapping
+from itertools import compress
+from BibtexEntry import BibtexEntry, BibtexFields, _get_field_layout, _mark_changed, get_fixed_contents, get_replacer
+from BibtexWriter import dump, write_file
+
+
+class BibtexColumn:
+    # The contents of one field for all rows. A column with few distinct contents (e.g. type, year or
+    # journal) is dictionary encoded: codes holds the position of every content in dictionary, -1 if the
+    # field is missing. Otherwise the contents are stored as one UTF-8 buffer, data, and the offsets of
+    # every row in it; contents set after that are kept in overrides (None for removed ones) until compact().
+    # presence is a bitmap with a set bit for every row holding the field.
+    def __init__(self, length: int):
+        self.length = length
+        self.presence = bytearray((length + 7) // 8)
+        self.dictionary = []
+        self.codes = array('i', [-1]) * length
+        self.data = None
+        self.offsets = None
+        self.overrides = None
+        self._codes_of_contents = {}
+
+    @property
+    def is_dictionary(self):
+        return self.data is None
+
+    def __len__(self):
+        return self.length
+
+    def set(self, row: int, content: str):
+        self.presence[row >> 3] |= 1 << (row & 7)
+        if not self.is_dictionary:
+            if self.overrides is None:
+                self.overrides = {}
+            self.overrides[row] = content
+            return
+        code = self._codes_of_contents.get(content)
+        if code is None:
+            code = self._codes_of_contents[content] = len(self.dictionary)
+            self.dictionary.append(content)
+        self.codes[row] = code
+
+    def remove(self, row: int):
+        self.presence[row >> 3] &= ~(1 << (row & 7)) & 0xff
+        if self.is_dictionary:
+            self.codes[row] = -1
+            return
+        if self.overrides is None:
+            self.overrides = {}
+        self.overrides[row] = None
+
+    def finish(self, max_dictionary_share=0.5):
+        # keeps the dictionary encoding only if there are few distinct contents
+        if len(self.dictionary) <= 16 or len(self.dictionary) <= self.length * max_dictionary_share:
+            return
+        encoded = [content.encode('utf8') for content in self.dictionary]
+        data, offsets, position = bytearray(), array('q', [0]), 0
+        for code in self.codes:
+            if code >= 0:
+                data += encoded[code]
+                position += len(encoded[code])
+            offsets.append(position)
+        self.data, self.offsets = bytes(data), offsets
+        self.dictionary, self.codes, self._codes_of_contents = None, None, None
+
+    def compact(self):
+        # writes the overrides into data and offsets
+        if not self.overrides:
+            return
+        data, offsets, position = bytearray(), array('q', [0]), 0
+        for row in range(self.length):
+            content = self.get(row)
+            if content is not None:
+                encoded = content.encode('utf8')
+                data += encoded
+                position += len(encoded)
+            offsets.append(position)
+        self.data, self.offsets, self.overrides = bytes(data), offsets, None
+
+    def is_present(self, row: int):
+        return bool(self.presence[row >> 3] >> (row & 7) & 1)
+
+    def get(self, row: int):
+        if self.data is None:
+            code = self.codes[row]
+            return self.dictionary[code] if code >= 0 else None
+        if not self.presence[row >> 3] >> (row & 7) & 1:
+            return None
+        if self.overrides and row in self.overrides:
+            return self.overrides[row]
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf8')
+
+    def values(self):
+        if self.is_dictionary:
+            dictionary = self.dictionary + [None]
+            return [dictionary[code] for code in self.codes]
+        return [self.get(row) for row in range(self.length)]
+
+    def present_rows(self):
+        if self.is_dictionary:
+            return list(compress(range(self.length), map((-1).__ne__, self.codes)))
+        return [row for row in range(self.length) if self.presence[row >> 3] >> (row & 7) & 1]
+
+    def matching_rows(self, function):
+        # rows whose content matches function, which is called once per distinct content if the column
+        # is dictionary encoded
+        if self.is_dictionary:
+            matches = [function(content) for content in self.dictionary] + [False]
+            return list(compress(range(self.length), map(matches.__getitem__, self.codes)))
+        return [row for row in self.present_rows() if function(self.get(row))]
+
+    def count(self):
+        if self.is_dictionary:
+            counts = Counter(self.codes)
+            counts.pop(-1, None)
+            return Counter({self.dictionary[code]: count for code, count in counts.items()})
+        return Counter(self.get(row) for row in self.present_rows())
+
+
+class ColumnEntry(BibtexEntry):
+    # A BibtexEntry whose key, type and fields are read from and written to a row of a BibtexColumns.
+    # fields is a ColumnFields, a mapping over the same row, so it never gets out of date.
+    __slots__ = ('_store', '_row')
+
+    @classmethod
+    def of_row(cls, store, row: int):
+        entry = cls.__new__(cls)
+        entry._store, entry._row = store, row
+        entry._fields, entry._watches = None, None
+        return entry
+
+    @property
+    def key(self):
+        return self._store.keys[self._row]
+
+    @key.setter
+    def key(self, key: str):
+        if self._watches is not None:
+            self._watches = _mark_changed(self._watches, True)
+        self._store.keys[self._row] = key
+
+    @property
+    def type(self):
+        return self._store.types.get(self._row)
+
+    @type.setter
+    def type(self, entryType: str):
+        self._changed()
+        self._store.types.set(self._row, entryType)
+
+    @property
+    def fields(self):
+        return ColumnFields(self)
+
+    @fields.setter
+    def fields(self, fields):
+        self.set_fields(fields)
+
+    def has_field(self, field: str):
+        return field in self._store.get_names(self._row)
+
+    def field_items(self):
+        store, row = self._store, self._row
+        names = store.get_names(row)
+        return zip(names, [store.columns[field].get(row) for field in names])
+
+    def get_field(self, field: str):
+        if not self.has_field(field):
+            raise KeyError(field)
+        return self._store.columns[field].get(self._row)
+
+    def set_field(self, field: str, content: str):
+        self._changed()
+        self._store.set_content(self._row, field, content)
+
+    def set_fields(self, fields: dict):
+        self._changed()
+        self._store.set_fields(self._row, fields)
+
+    def fix_special_characters(self, fields=None, replace_chars=None, only_if_url_or_href=False):
+        replaced = get_fixed_contents(self.field_items(), get_replacer(replace_chars), fields, only_if_url_or_href)
+        if not replaced:
+            return False
+        self._changed()
+        for field, content in replaced.items():
+            self._store.set_content(self._row, field, content)
+        return True
+
+    def __len__(self):
+        return len(self._store.get_names(self._row))
+
+    def __getattr__(self, field):
+        if field in ('_store', '_row'):
+            raise AttributeError(field)
+        return super().__getattr__(field)
+
+    def __copy__(self):
+        return BibtexEntry.from_fields(self.key, self.type, dict(self.field_items()))
+
+    def __getstate__(self):
+        names = self._store.get_names(self._row)
+        return self.key, self.type, names, tuple([content for _, content in self.field_items()])
+
+    def __reduce__(self):
+        # copies are detached BibtexEntry objects
+        return BibtexEntry.from_state, (self.__getstate__(),)
+
+
+class ColumnFields(MutableMapping):
+    # the fields of a ColumnEntry as an ordered mapping, reading and writing its row
+    def __init__(self, entry: ColumnEntry):
+        self.entry = entry
+
+    def __getitem__(self, field):
+        return self.entry.get_field(field)
+
+    def __setitem__(self, field, content):
+        self.entry.set_field(field, content)
+
+    def __delitem__(self, field):
+        if not self.entry.has_field(field):
+            raise KeyError(field)
+        self.entry._changed()
+        self.entry._store.remove_field(self.entry._row, field)
+
+    def __iter__(self):
+        return iter(self.entry._store.get_names(self.entry._row))
+
+    def __len__(self):
+        return len(self.entry)
+
+    def __contains__(self, field):
+        return self.entry.has_field(field)
+
+    def items(self):
+        return list(self.entry.field_items())
+
+    def move_to_end(self, field, last=True):
+        names = self.entry._store.get_names(self.entry._row)
+        if field not in names:
+            raise KeyError(field)
+        others = tuple(name for name in names if name != field)
+        self.entry._changed()
+        self.entry._store.set_names(self.entry._row, others + (field,) if last else (field,) + others)
+
+    def copy(self):
+        return BibtexFields(self.entry.field_items())
+
+    def __repr__(self):
+        return 'ColumnFields(%r)' % self.items()
+
+
+class BibtexColumns:
+    # The entries of a list in columns: the keys, a dictionary encoded column of types, one BibtexColumn per
+    # field name and the field order of every row (a shared tuple of names per distinct order). entries holds
+    # a ColumnEntry for every row, which reads and writes the columns. The views of previous, the columns the
+    # entries were stored in before, are moved to the new rows instead of being replaced.
+    def __init__(self, entries, previous=None):
+        entries = entries if isinstance(entries, list) else list(entries)
+        length = len(entries)
+        self.keys = [entry.key for entry in entries]
+        self.types = BibtexColumn(length)
+        self.columns = {}
+        self.layouts = []
+        self.layout_codes = array('i', [0]) * length
+        self._layout_codes = {}
+        for row, entry in enumerate(entries):
+            self.types.set(row, entry.type)
+            names = []
+            for field, content in entry.field_items():
+                column = self.columns.get(field)
+                if column is None:
+                    column = self.columns[field] = BibtexColumn(length)
+                column.set(row, content)
+                names.append(field)
+            self.layout_codes[row] = self._get_layout_code(tuple(names))
+        self.types.finish(max_dictionary_share=1.0)
+        for column in self.columns.values():
+            column.finish()
+        self.entries = []
+        moved = set()
+        for row, entry in enumerate(entries):
+            if previous is not None and type(entry) is ColumnEntry and entry._store is previous and id(entry) not in moved:
+                # an entry that is in the list twice gets a new view for its second row
+                moved.add(id(entry))
+                entry._store, entry._row = self, row
+            else:
+                entry = ColumnEntry.of_row(self, row)
+            self.entries.append(entry)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, row):
+        return self.entries[row]
+
+    def get_entry(self, row: int):
+        return self.entries[row]
+
+    def get_names(self, row: int):
+        return self.layouts[self.layout_codes[row]]
+
+    def set_names(self, row: int, names: tuple):
+        self.layout_codes[row] = self._get_layout_code(names)
+
+    def _get_layout_code(self, names: tuple):
+        code = self._layout_codes.get(names)
+        if code is None:
+            code = self._layout_codes[names] = len(self.layouts)
+            self.layouts.append(_get_field_layout(names))
+        return code
+
+    def set_content(self, row: int, field: str, content: str):
+        column = self.columns.get(field)
+        if column is None:
+            column = self.columns[field] = BibtexColumn(len(self.keys))
+        column.set(row, content)
+        names = self.get_names(row)
+        if field not in names:
+            self.set_names(row, names + (field,))
+
+    def remove_field(self, row: int, field: str):
+        self.columns[field].remove(row)
+        self.set_names(row, tuple(name for name in self.get_names(row) if name != field))
+
+    def set_fields(self, row: int, fields: dict):
+        fields = dict(fields)
+        for field in self.get_names(row):
+            if field not in fields:
+                self.columns[field].remove(row)
+        for field, content in fields.items():
+            column = self.columns.get(field)
+            if column is None:
+                column = self.columns[field] = BibtexColumn(len(self.keys))
+            if column.get(row) != content:
+                column.set(row, content)
+        self.set_names(row, tuple(fields))
+
+    def get_column(self, field: str):
+        # the type column is called 'type', a field named type is not supported
+        if field == 'type':
+            return self.types
+        column = self.columns.get(field)
+        if column is None:
+            raise KeyError(field)
+        return column
+
+    def _rows(self, field, function):
+        if field != 'type' and field not in self.columns:
+            return []
+        return function(self.get_column(field))
+
+    def equal(self, field: str, content: str):
+        return self._rows(field, lambda column: column.matching_rows(content.__eq__))
+
+    def isin(self, field: str, contents):
+        contents = set(contents)
+        return self._rows(field, lambda column: column.matching_rows(contents.__contains__))
+
+    def where(self, field: str, function):
+        return self._rows(field, lambda column: column.matching_rows(function))
+
+    def present(self, field: str):
+        return self._rows(field, BibtexColumn.present_rows)
+
+    def missing(self, field: str):
+        present = set(self.present(field))
+        return [row for row in range(len(self.keys)) if row not in present]
+
+    def project(self, fields, rows=None):
+        # a list of tuples with the contents of fields for rows, None for missing fields
+        columns = [self.get_column(field) if field == 'type' or field in self.columns else None for field in fields]
+        if rows is None:
+            rows = range(len(self.keys))
+        if all(column is not None and column.is_dictionary for column in columns):
+            dictionaries = [column.dictionary + [None] for column in columns]
+            return [tuple(dictionary[column.codes[row]] for dictionary, column in zip(dictionaries, columns)) for row in rows]
+        return [tuple(column.get(row) if column is not None else None for column in columns) for row in rows]
+
+    def group_by(self, field: str, rows=None):
+        # maps every content of field to the rows holding it, rows without the field are left out
+        groups = {}
+        if field != 'type' and field not in self.columns:
+            return groups
+        column = self.get_column(field)
+        if rows is None:
+            rows = column.present_rows()
+        for row in rows:
+            content = column.get(row)
+            if content is not None:
+                groups.setdefault(content, []).append(row)
+        return groups
+
+    def count(self, field: str):
+        if field != 'type' and field not in self.columns:
+            return Counter()
+        return self.get_column(field).count()
+
+    def select(self, rows):
+        return [self.entries[row] for row in rows]
+
+    def to_numpy(self, field: str):
+        # Without copying: (codes, dictionary) for a dictionary encoded column, (offsets, data) otherwise,
+        # codes and offsets as integer arrays and data as uint8 array. Contents set through the entries since
+        # the columns were built are written into data first. Needs numpy.
+        import numpy
+        column = self.get_column(field)
+        column.compact()
+        if column.is_dictionary:
+            return numpy.frombuffer(column.codes, dtype=numpy.int32), column.dictionary
+        return numpy.frombuffer(column.offsets, dtype=numpy.int64), numpy.frombuffer(column.data, dtype=numpy.uint8)
+
+    def presence_to_numpy(self, field: str):
+        import numpy
+        bits = numpy.unpackbits(numpy.frombuffer(self.get_column(field).presence, dtype=numpy.uint8), bitorder='little')
+        return bits[:len(self.keys)].astype(bool)
+
+    def dump(self, stream, pretty_print=True):
+        dump(iter(self), stream, pretty_print)
+
+    def write(self, filename: str, pretty_print=True, append=False, atomic=False):
+        write_file(iter(self), filename, pretty_print, append, atomic)
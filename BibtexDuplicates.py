@@ -0,0 +1,182 @@
+import re
+import sys
+import zlib
+import hashlib
+import unicodedata
+from array import array
+
+regex_accent = re.compile(r'\\(?:[`\'^"~=.]|[uvHckrbd](?![a-zA-Z]))\s*\{?\s*([a-zA-Z])\s*\}?')
+regex_command = re.compile(r'\\[a-zA-Z]+')
+regex_markup = re.compile(r'[{}$\\]')
+regex_non_word = re.compile(r'[\W_]+')
+regex_and = re.compile(r'\s+and\s+', re.IGNORECASE)
+regex_year = re.compile(r'\d{4}')
+
+shingle_size = 4
+
+
+def normalize(text: str):
+    # lower case words without LaTeX markup or accents, separated by single spaces
+    if '\\' in text or '{' in text or '$' in text:
+        text = regex_markup.sub('', regex_command.sub(' ', regex_accent.sub(r'\1', text)))
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return regex_non_word.sub(' ', text.lower()).strip()
+
+
+def get_shingles(title: str):
+    if len(title) <= shingle_size:
+        return {title} if title else set()
+    return {title[idx:idx + shingle_size] for idx in range(len(title) - shingle_size + 1)}
+
+
+def get_last_names(author: str):
+    names = set()
+    for name in regex_and.split(author):
+        if ',' in name:
+            name = name.split(',', 1)[0]
+        words = normalize(name).split()
+        if words:
+            names.add(words[-1])
+    return frozenset(names)
+
+
+def get_year(year: str):
+    match = regex_year.search(year)
+    return int(match.group()) if match else None
+
+
+class DuplicateFinder:
+    # Finds entries that describe the same work under different keys. Titles are normalized and cut into
+    # character shingles, whose MinHash signature (one CRC-32 per shingle, spread over bands * rows bins) is
+    # split into bands. Only entries sharing all rows of a band are compared, each one with the next window
+    # entries of the same band. A pair is a duplicate if its weighted similarity of titles (Jaccard of the
+    # shingles), authors (Jaccard of the last names) and years reaches threshold. Duplicates are joined
+    # into clusters.
+    weights = (0.6, 0.3, 0.1)
+
+    def __init__(self, threshold=0.8, bands=8, rows=5, window=50):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.window = window
+        self.candidates = 0
+        self.comparisons = 0
+
+    def find(self, entries):
+        # returns a list of (positions, score) sorted by position, score being the lowest similarity of
+        # the pairs that joined the cluster
+        entries = entries if isinstance(entries, list) else list(entries)
+        signatures = self._get_band_hashes(entries)
+        parents, scores = {}, {}
+        compared = set()
+        self.candidates = self.comparisons = 0
+        for band in range(self.bands):
+            # the features are only kept for one band, the entries colliding in a band are few
+            features = {}
+            hashes = signatures[band::self.bands]
+            order = sorted((idx for idx in range(len(entries)) if hashes[idx] != 0), key=hashes.__getitem__)
+            start = 0
+            while start < len(order):
+                stop = start + 1
+                while stop < len(order) and hashes[order[stop]] == hashes[order[start]]:
+                    stop += 1
+                for i in range(start, stop):
+                    for j in range(i + 1, min(stop, i + 1 + self.window)):
+                        pair = (order[i], order[j]) if order[i] < order[j] else (order[j], order[i])
+                        self.candidates += 1
+                        if pair in compared: continue
+                        compared.add(pair)
+                        self.comparisons += 1
+                        score = self.similarity(self._get_features(entries, pair[0], features),
+                                                self._get_features(entries, pair[1], features))
+                        if score >= self.threshold:
+                            self._join(parents, scores, pair, score)
+                start = stop
+        clusters = {}
+        for idx in parents:
+            clusters.setdefault(self._find_root(parents, idx), []).append(idx)
+        return sorted(((sorted(positions), scores[root]) for root, positions in clusters.items() if len(positions) > 1))
+
+    def similarity(self, features, other):
+        shingles, names, year = features
+        other_shingles, other_names, other_year = other
+        title = len(shingles & other_shingles) / len(shingles | other_shingles) if shingles or other_shingles else 0.0
+        if names and other_names:
+            author = len(names & other_names) / len(names | other_names)
+        else:
+            author = 0.5
+        if year is None or other_year is None:
+            year_similarity = 0.5
+        else:
+            year_similarity = max(0.0, 1.0 - abs(year - other_year) / 2)
+        return self.weights[0] * title + self.weights[1] * author + self.weights[2] * year_similarity
+
+    def get_features(self, entry):
+        title = normalize(entry.get_field('title')) if entry.has_field('title') else ''
+        names = get_last_names(entry.get_field('author')) if entry.has_field('author') else frozenset()
+        year = get_year(entry.get_field('year')) if entry.has_field('year') else None
+        return get_shingles(title), names, year
+
+    def _get_features(self, entries, idx, features):
+        cached = features.get(idx)
+        if cached is None:
+            cached = features[idx] = self.get_features(entries[idx])
+        return cached
+
+    def _get_band_hashes(self, entries):
+        # one hash per band and entry, 0 for entries without title; the hashes do not depend on the process,
+        # unlike hash() of strings, so the same entries always give the same clusters
+        bins, rows, mask = self.bands * self.rows, self.rows, sys.maxsize
+        band_hashes = array('q', bytes(8 * self.bands * len(entries)))
+        empty = [mask] * bins
+        for idx, entry in enumerate(entries):
+            if not entry.has_field('title'): continue
+            shingles = get_shingles(normalize(entry.get_field('title')).encode('utf8'))
+            if not shingles: continue
+            signature = empty[:]
+            for value in map(zlib.crc32, shingles):
+                position = value % bins
+                value //= bins
+                if value < signature[position]:
+                    signature[position] = value
+            self._densify(signature, mask)
+            offset, data = idx * self.bands, memoryview(array('q', signature).tobytes())
+            for band in range(self.bands):
+                digest = hashlib.blake2b(data[8 * band * rows:8 * (band + 1) * rows], digest_size=8).digest()
+                band_hashes[offset + band] = (int.from_bytes(digest, 'little', signed=True) ^ band) or 1
+        return band_hashes
+
+    @staticmethod
+    def _densify(signature, empty):
+        # empty bins take the value of the next filled bin, made negative and shifted by their distance
+        bins = len(signature)
+        if empty not in signature:
+            return
+        next_value, distance = empty, 0
+        for position in range(2 * bins - 1, -1, -1):
+            value = signature[position % bins]
+            if value >= 0 and value != empty:
+                next_value, distance = value, 0
+            else:
+                distance += 1
+                if position < bins and next_value != empty:
+                    signature[position] = -(next_value * bins + distance) - 1
+
+    @staticmethod
+    def _find_root(parents, idx):
+        while parents[idx] != idx:
+            parents[idx] = parents[parents[idx]]
+            idx = parents[idx]
+        return idx
+
+    def _join(self, parents, scores, pair, score):
+        for idx in pair:
+            if idx not in parents:
+                parents[idx] = idx
+                scores[idx] = 1.0
+        first, second = self._find_root(parents, pair[0]), self._find_root(parents, pair[1])
+        if first == second:
+            return
+        parents[second] = first
+        scores[first] = min(scores[first], scores[second], score)
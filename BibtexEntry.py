@@ -1,63 +1,330 @@
 import re
+import sys
+import weakref
 from collections import OrderedDict
 
+get_url_from_latex_url = re.compile(r'\\url\{\s*(.*)\s*\}')
+get_url_from_href = re.compile(r'\\href\{(.*)\}\{.*\}')
+get_title_from_href = re.compile(r'\\href\{.*\}\{(.*)\}')
+
+# compiled replacers of fix_special_characters by their replacements
+_replacers = {}
+default_replace_chars = (('%', '\\%'), ('&', '\\&'))
+
+# tuples of field names shared by all compact entries with the same fields in the same order
+_field_layouts = {}
+
+
+def _get_field_layout(names: tuple):
+    layout = _field_layouts.get(names)
+    if layout is None:
+        layout = tuple([sys.intern(field) for field in names])
+        _field_layouts[layout] = layout
+    return layout
+
+
+def get_replacer(replace_chars=None):
+    # Returns a function replacing every first character sequence of replace_chars by the second one in a
+    # single pass. A replacement is skipped for contents that already hold its second sequence.
+    if replace_chars is None:
+        replace_chars = default_replace_chars
+    replace_chars = tuple((old, new) for old, new in replace_chars)
+    replacer = _replacers.get(replace_chars)
+    if replacer is not None:
+        return replacer
+    replacements = dict(reversed(replace_chars))
+    if not replacements:
+        return str
+    regex = re.compile('|'.join(re.escape(old) for old in sorted(replacements, key=len, reverse=True)))
+    def replace_all(match):
+        return replacements[match.group()]
+    def replacer(content: str):
+        if regex.search(content) is None:
+            return content
+        skipped = [old for old, new in replace_chars if new in content]
+        if not skipped:
+            return regex.sub(replace_all, content)
+        return regex.sub(lambda match: match.group() if match.group() in skipped else replacements[match.group()], content)
+    _replacers[replace_chars] = replacer
+    return replacer
+
+
+def get_fixed_contents(field_items, replacer, fields=None, only_if_url_or_href=False):
+    # the contents of field_items that replacer changes, of the given fields or all fields, by field
+    fixed = {}
+    for field, content in field_items:
+        if fields is not None and field not in fields: continue
+        if only_if_url_or_href and ('\\url{' not in content and '\\href{' not in content):
+            continue
+        new_content = replacer(content)
+        if new_content != content:
+            fixed[field] = new_content
+    return fixed
+
+
+class EntryWatch:
+    # Handed to the entries an index is built over by add. It is changed by the first change of the key of one
+    # of them or, unless keys_only, of the type or fields of one of them, and the index with it is then stale.
+    # The entries drop it once it changed or its owner, the holder of the index, is gone.
+    __slots__ = ('changed', 'keys_only', 'owner')
+
+    def __init__(self, owner, keys_only=False):
+        self.changed = False
+        self.keys_only = keys_only
+        self.owner = weakref.ref(owner)
+
+    def add(self, entries):
+        # entries with the same watches share one tuple of them; the OrderedDict of the fields of an entry
+        # holds the watches of its fields as well
+        shared = {}
+        for entry in entries:
+            watches = entry._watches
+            new_watches = shared.get(watches)
+            if new_watches is None:
+                new_watches = shared[watches] = self._added_to(watches)
+            entry._watches = new_watches
+            if entry._fields is not None and not self.keys_only:
+                watches = entry._fields._watches
+                new_watches = shared.get(watches)
+                if new_watches is None:
+                    new_watches = shared[watches] = self._added_to(watches)
+                entry._fields._watches = new_watches
+
+    def _added_to(self, watches):
+        if watches is None:
+            return (self,)
+        return tuple([watch for watch in watches if not watch.changed and watch.owner() is not None]) + (self,)
+
+
+def _mark_changed(watches, key_changed):
+    # returns the watches that stay unchanged, the ones of keys if only the type or fields changed
+    kept = []
+    for watch in watches:
+        if key_changed or not watch.keys_only:
+            watch.changed = True
+        elif not watch.changed:
+            kept.append(watch)
+    if len(kept) == len(watches):
+        return watches
+    return tuple(kept) if kept else None
+
+
+class BibtexFields(OrderedDict):
+    # the OrderedDict of an entry's fields, marking the EntryWatch objects of the entries holding it as changed
+    # when it changes; _watches only holds those that are not keys_only
+    __slots__ = ('_watches',)
+
+    def __init__(self, fields=()):
+        # filling a new dict does not change an entry
+        super().__init__()
+        self._watches = None
+        if hasattr(fields, 'keys'):
+            fields = [(field, fields[field]) for field in fields.keys()]
+        for field, content in fields:
+            OrderedDict.__setitem__(self, field, content)
+
+    def __reduce__(self):
+        return BibtexFields, (list(self.items()),)
+
+    def copy(self):
+        return BibtexFields(self.items())
+
+    def __setitem__(self, field, content):
+        self._changed()
+        OrderedDict.__setitem__(self, field, content)
+
+    def __delitem__(self, field):
+        self._changed()
+        OrderedDict.__delitem__(self, field)
+
+    def pop(self, *args):
+        self._changed()
+        return OrderedDict.pop(self, *args)
+
+    def popitem(self, last=True):
+        self._changed()
+        return OrderedDict.popitem(self, last)
+
+    def setdefault(self, field, content=None):
+        self._changed()
+        return OrderedDict.setdefault(self, field, content)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        OrderedDict.update(self, *args, **kwargs)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        self._changed()
+        OrderedDict.clear(self)
+
+    def move_to_end(self, field, last=True):
+        self._changed()
+        OrderedDict.move_to_end(self, field, last)
+
+    def _changed(self):
+        if self._watches is not None:
+            for watch in self._watches:
+                watch.changed = True
+            self._watches = None
+
+
 class BibtexEntry:
+    # An entry either owns an OrderedDict of its fields or, when created by from_fields, stores the
+    # field names (a tuple shared between entries) and the contents as two parallel tuples.
+    # The OrderedDict is only created when the fields attribute is used.
+    # _watches holds the EntryWatch objects of the indexes over the entry, which its changes mark as changed.
+    __slots__ = ('_key', '_type', '_fields', '_names', '_values', '_watches')
+
     def __init__(self, key: str, entryType='article'):
-        self.key = key
-        self.type = entryType
-        self.fields = OrderedDict()
-        self.get_url_from_latex_url = re.compile(r'\\url\{\s*(.*)\s*\}')
-        self.get_url_from_href = re.compile(r'\\href\{(.*)\}\{.*\}')
-        self.get_title_from_href = re.compile(r'\\href\{.*\}\{(.*)\}')
+        self._key = key
+        self._type = entryType
+        self._fields = None
+        self._names = ()
+        self._values = ()
+        self._watches = None
+
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key: str):
+        if self._watches is not None:
+            self._watches = _mark_changed(self._watches, True)
+        self._key = key
+
+    def _changed(self):
+        # the type or fields changed
+        if self._watches is not None:
+            self._watches = _mark_changed(self._watches, False)
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, entryType: str):
+        self._changed()
+        self._type = entryType
+
+    @classmethod
+    def from_fields(cls, key: str, entryType, fields: dict):
+        entry = cls(key, sys.intern(entryType))
+        entry._names = _get_field_layout(tuple(fields))
+        entry._values = tuple(fields.values())
+        return entry
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = BibtexFields(zip(self._names, self._values))
+            self._names = self._values = None
+            if self._watches is not None:
+                self._fields._watches = tuple([watch for watch in self._watches if not watch.keys_only]) or None
+        return self._fields
+
+    @fields.setter
+    def fields(self, fields):
+        self._changed()
+        self._fields = fields if isinstance(fields, BibtexFields) else BibtexFields(fields)
+        self._names = self._values = None
+
+    def has_field(self, field: str):
+        if self._fields is None:
+            return field in self._names
+        return field in self._fields
+
+    def field_items(self):
+        if self._fields is None:
+            return zip(self._names, self._values)
+        return self._fields.items()
 
     def set_field(self, field: str, content: str):
         self.fields[field] = content
 
     def get_field(self, field: str):
-        return self.fields[field]
+        if self._fields is None:
+            try:
+                return self._values[self._names.index(field)]
+            except ValueError:
+                raise KeyError(field)
+        return self._fields[field]
+
+    def verbatim(self):
+        # the source text of the entry if it can be written unchanged, see LazyBibtexEntry
+        return None
 
     def __name__(self):
         return 'BibtexEntry'
 
     def __str__(self):
         str = self.type + ' ' + self.key + '\n'
-        for field in self.fields:
-            str += field + ' = ' + self.fields[field] + '\n'
+        for field, content in self.field_items():
+            str += field + ' = ' + content + '\n'
         return str
 
     def __repr__(self):
         return self.__str__()
 
     def __len__(self):
-        return len(self.fields.keys())
+        if self._fields is None:
+            return len(self._names)
+        return len(self._fields)
 
     def __getattr__(self, field):
-        if 'fields' in self.__dict__:
-            if field in self.__dict__['fields']:
-                return self.__dict__['fields'][field]
-            else:
-                 raise AttributeError('Entry has no field ' + field)
+        # only called for names that are not slots; slots are only missing while unpickling
+        if field.startswith('__') or field in BibtexEntry.__slots__ or field in ('key', 'type'):
+            raise AttributeError(field)
+        try:
+            return self.get_field(field)
+        except KeyError:
+            raise AttributeError('Entry has no field ' + field)
 
     def __copy__(self):
         entry = BibtexEntry(key=self.key, entryType=self.type)
-        entry.fields = self.fields
+        if self._fields is None:
+            entry._names, entry._values = self._names, self._values
+        else:
+            entry._fields, entry._names, entry._values = self._fields, None, None
         return entry
 
     def __deepcopy__(self, memo={}):
         entry = BibtexEntry(key=self.key, entryType=self.type)
-        entry.fields = OrderedDict()
-        for field in self.fields:
-            entry[field] = self.fields[field]
+        entry._fields, entry._names, entry._values = BibtexFields(self.field_items()), None, None
+        return entry
+
+    def __getstate__(self):
+        if self._fields is None:
+            return self.key, self.type, self._names, self._values
+        return self.key, self.type, self._fields
+
+    @classmethod
+    def from_state(cls, state):
+        entry = cls.__new__(cls)
+        entry.__setstate__(state)
         return entry
 
+    def __setstate__(self, state):
+        # unpickled entries share their field layouts with the other entries as well
+        self._key, self._type, self._watches = state[0], sys.intern(state[1]), None
+        if len(state) == 4:
+            self._fields, self._names, self._values = None, _get_field_layout(state[2]), state[3]
+        else:
+            fields = state[2] if isinstance(state[2], BibtexFields) else BibtexFields(state[2])
+            self._fields, self._names, self._values = fields, None, None
+
     def set_order_of_fields(self, order):
         new_fields = OrderedDict()
         for field in order:
-            if field in self.fields:
-                new_fields[field] = self.fields[field]
-        for field in self.fields:
-            if field not in order:
-                new_fields[field] = self.fields[field]
+            if self.has_field(field):
+                new_fields[field] = self.get_field(field)
+        for field, content in self.field_items():
+            if field not in new_fields:
+                new_fields[field] = content
         self.fields = new_fields
 
     def set_field_last(self, field: str):
@@ -68,12 +335,12 @@ class BibtexEntry:
             return False
 
     def use_field_in_field_as_href(self, from_field='url', to_field='title', remove_from_field=True):
-        if not (from_field in self.fields and to_field in self.fields):
+        if not (self.has_field(from_field) and self.has_field(to_field)):
             return False
         from_content = self.fields[from_field]
         if '\\url{' in from_content:
-            from_content = self.get_url_from_latex_url.search(from_content).group(1)
-        self.fields[to_field] = '\href{' + from_content + '}{' + self.fields[to_field] + '}'
+            from_content = get_url_from_latex_url.search(from_content).group(1)
+        self.fields[to_field] = '\\href{' + from_content + '}{' + self.fields[to_field] + '}'
         if remove_from_field:
             del self.fields[from_field]
         return True
@@ -82,32 +349,39 @@ class BibtexEntry:
         self.use_field_in_field_as_href(from_field='url', to_field='title', remove_from_field=True)
 
     def use_href_from_title_as_url(self, replace=True, use_url_package=True):
-        if not 'title' in self.fields: return False
-        url = self.get_url_from_href.search(self.fields['title'])
+        if not self.has_field('title'): return False
+        url = get_url_from_href.search(self.fields['title'])
         if url is None: return False
-        title = self.get_title_from_href.search(self.field['title'])
+        title = get_title_from_href.search(self.fields['title'])
         if title is None: return False
         title = title.group(1)
         url = '\\url{' + url.group(1) + '}' if use_url_package else url.group(1)
-        if replace and 'url' in self.fields:
+        if replace or 'url' not in self.fields:
             self.fields['url'] = url
+        self.fields['title'] = title
+        return True
+
+    def fix_special_characters(self, fields=None, replace_chars=None, only_if_url_or_href=False):
+        replaced = get_fixed_contents(self.field_items(), get_replacer(replace_chars), fields, only_if_url_or_href)
+        if not replaced:
+            return False
+        if self._fields is None:
+            self._changed()
+            self._values = tuple([replaced.get(field, content) for field, content in zip(self._names, self._values)])
         else:
-            self.field['url'] = url
-        self.contents['title'] = title
+            self._fields.update(replaced)
         return True
 
-    # def fix_special_characters(self, fields=None, replace_chars=None, only_if_url_or_href=False):
-    #     if replace_chars is None:
-    #         replace_chars = [['%', '\%'], ['&', '\&']]
-    #     if fields is None:
-    #         fields = [field for field in self.fields]
-    #     for field in fields:
-    #         if field not in self.fields: continue
-    #         if only_if_url_or_href and ('\\url{' not in self.fields[field] and '\\href{' not in self.fields[field]):
-    #             continue
-    #         for replacement in replace_chars:
-    #             if replacement[1] in self.fields[field]: continue
-    #             self.fields[field] = self.fields[field].replace(replacement[0], replacement[1])
+    def set_fields(self, fields: dict):
+        # stores the fields like from_fields does, or in the OrderedDict if it was handed out before
+        self._changed()
+        if self._fields is not None:
+            self._fields.clear()
+            self._fields.update(fields)
+            return
+        self._fields = None
+        self._names = _get_field_layout(tuple(fields))
+        self._values = tuple(fields.values())
 
     def remove_fields(self, fields):
         for field in fields:
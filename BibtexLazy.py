@@ -0,0 +1,133 @@
+import sys
+from array import array
+from BibtexEntry import BibtexEntry, _get_field_layout
+from BibtexTokenizer import BibtexTokenizer
+
+tokenizer = BibtexTokenizer(binary=True)
+
+
+class LazySource:
+    # the UTF-8 text of a file, the spans, keys and types of its entries and the tokenizer splitting their
+    # fields, shared by their LazyBibtexEntry objects; the text is freed with the last of them. It is kept as
+    # bytes because a str holding a single non-ASCII character takes two or four bytes for every character of
+    # the file.
+    __slots__ = ('buffer', 'starts', 'bodies', 'ends', 'keys', 'types', 'tokenizer')
+
+    def __init__(self, buffer: bytes, tokenizer=tokenizer):
+        self.buffer = buffer
+        self.tokenizer = tokenizer
+        self.starts, self.bodies, self.ends = array('q'), array('q'), array('q')
+        self.keys, self.types = [], []
+
+    def add(self, span):
+        entry_type, key, start, body, end = span
+        self.starts.append(start)
+        self.bodies.append(body)
+        self.ends.append(end)
+        self.keys.append(key)
+        self.types.append(sys.intern(entry_type))
+        return len(self.keys) - 1
+
+
+class LazyBibtexEntry(BibtexEntry):
+    # An entry that only knows its key, type and the position of its text in a LazySource until its fields
+    # are used. Reading the fields splits the text once. As long as the fields are not replaced or handed
+    # out as OrderedDict and the key and type are unchanged, verbatim() returns the text of the entry,
+    # which is then written unchanged. The entries of a file share its text instead of copying their own,
+    # so the text stays in memory as long as one of them is alive.
+    __slots__ = ('_source', '_index')
+
+    def __init__(self, source: LazySource, index: int):
+        super().__init__(source.keys[index], source.types[index])
+        self._names = self._values = None
+        self._source = source
+        self._index = index
+
+    def verbatim(self):
+        if self._source is None or self._fields is not None:
+            return None
+        source, index = self._source, self._index
+        if source.keys[index] != self.key or source.types[index] != self.type:
+            return None
+        text = source.buffer[source.starts[index]:source.ends[index]].decode('utf8')
+        if '\r' in text:
+            # as read in text mode
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def __getattr__(self, field):
+        if field in ('_source', '_index'):
+            raise AttributeError(field)
+        return super().__getattr__(field)
+
+    def is_loaded(self):
+        return self._names is not None or self._fields is not None
+
+    def _load(self):
+        if self._names is None and self._fields is None:
+            source, index = self._source, self._index
+            fields = dict(source.tokenizer.iter_fields(source.buffer, source.bodies[index], source.ends[index] - 1))
+            self._names = _get_field_layout(tuple(fields))
+            self._values = tuple(fields.values())
+
+    @property
+    def fields(self):
+        self._load()
+        return BibtexEntry.fields.fget(self)
+
+    @fields.setter
+    def fields(self, fields):
+        BibtexEntry.fields.fset(self, fields)
+
+    def has_field(self, field: str):
+        self._load()
+        return super().has_field(field)
+
+    def field_items(self):
+        self._load()
+        return super().field_items()
+
+    def get_field(self, field: str):
+        self._load()
+        return super().get_field(field)
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def __copy__(self):
+        entry = LazyBibtexEntry.__new__(LazyBibtexEntry)
+        entry._key, entry._type, entry._source, entry._index = self.key, self.type, self._source, self._index
+        entry._watches = None
+        entry._fields, entry._names, entry._values = None, self._names, self._values
+        if self._fields is not None:
+            entry._fields = self._fields
+        return entry
+
+    def __getstate__(self):
+        self._load()
+        return super().__getstate__()
+
+    def __setstate__(self, state):
+        self._source = None
+        super().__setstate__(state)
+
+    def fix_special_characters(self, fields=None, replace_chars=None, only_if_url_or_href=False):
+        replaced = super().fix_special_characters(fields, replace_chars, only_if_url_or_href)
+        if replaced:
+            self._source = None
+        return replaced
+
+    def set_fields(self, fields: dict):
+        self._source = None
+        super().set_fields(fields)
+
+
+def parse_lazy(buffer, tokenizer=tokenizer):
+    # buffer holds the text of a file, preferably as the bytes read from it; tokenizer is a binary tokenizer,
+    # which also splits the fields of the entries when they are loaded
+    if isinstance(buffer, str):
+        buffer = buffer.encode('utf8')
+    source = LazySource(buffer, tokenizer)
+    for span in tokenizer.iter_spans(buffer):
+        yield LazyBibtexEntry(source, source.add(span))
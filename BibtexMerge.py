@@ -0,0 +1,107 @@
+import os
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from BibtexWriter import write_file
+
+policies = ('first', 'last', 'union')
+
+
+class BibtexMerger:
+    # Merges BibtexParsers, .bib files, streams or iterables of entries by key. Of entries with the same
+    # key, policy 'first' keeps the first one, 'last' the last one and 'union' the first one extended by
+    # the fields only the later ones have. After a merge, collisions maps every key found more than once
+    # to the indexes of the sources it was found in.
+    def __init__(self, policy='first'):
+        if policy not in policies:
+            raise ValueError('merge policy must be one of ' + ', '.join(policies))
+        self.policy = policy
+        self.collisions = {}
+
+    def merge(self, sources):
+        # returns a BibtexParser holding the merged entries in the order of their first occurrence
+        self.collisions = {}
+        positions, first_sources, entries = {}, {}, []
+        for source_idx, entry in self._iter_sources(sources):
+            position = positions.get(entry.key)
+            if position is None:
+                positions[entry.key] = len(entries)
+                first_sources[entry.key] = source_idx
+                entries.append(entry)
+                continue
+            self._add_collision(entry.key, first_sources, source_idx)
+            if self.policy == 'last':
+                entries[position] = entry
+            elif self.policy == 'union':
+                entries[position] = _union(entries[position], entry)
+        return BibtexParser(entries)
+
+    def iter_merge(self, sources):
+        # Yields the merged entries in the order of their first occurrence, like merge, without keeping
+        # the sources in memory. With 'first' an entry is yielded at its first occurrence and the sources
+        # are read once. The other policies read the sources twice, so they need files or parsers: the
+        # first pass keeps the later occurrences of every key, the second one merges them into the first
+        # occurrence.
+        self.collisions = {}
+        if self.policy == 'first':
+            first_sources = {}
+            for source_idx, entry in self._iter_sources(sources):
+                if entry.key in first_sources:
+                    self._add_collision(entry.key, first_sources, source_idx)
+                    continue
+                first_sources[entry.key] = source_idx
+                yield entry
+            return
+        sources = list(sources)
+        for source in sources:
+            if source == '-' or not isinstance(source, (BibtexParser, str, os.PathLike, list, tuple)):
+                raise ValueError('merge policy ' + self.policy + ' needs sources that can be read twice')
+        later, first_sources = {}, {}
+        for source_idx, entry in self._iter_sources(sources):
+            if entry.key in first_sources:
+                later.setdefault(entry.key, []).append(entry)
+                self._add_collision(entry.key, first_sources, source_idx)
+            else:
+                first_sources[entry.key] = source_idx
+        del first_sources
+        merged_keys = set()
+        for _, entry in self._iter_sources(sources):
+            others = later.pop(entry.key, None)
+            if others is not None:
+                for other in others:
+                    entry = other if self.policy == 'last' else _union(entry, other)
+                merged_keys.add(entry.key)
+            elif entry.key in merged_keys:
+                continue
+            yield entry
+
+    def write(self, sources, filename: str, pretty_print=True, atomic=True):
+        write_file(self.iter_merge(sources), filename, pretty_print, atomic=atomic)
+
+    def _add_collision(self, key: str, first_sources, source_idx):
+        collision = self.collisions.get(key)
+        if collision is None:
+            collision = self.collisions[key] = [first_sources[key]]
+        collision.append(source_idx)
+
+    @staticmethod
+    def _iter_sources(sources):
+        for source_idx, source in enumerate(sources):
+            if isinstance(source, BibtexParser):
+                entries = source.entries
+            elif isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+                entries = BibtexParser().iterparse(source)
+            else:
+                entries = source
+            for entry in entries:
+                yield source_idx, entry
+
+
+def _union(entry, other):
+    fields = dict(entry.field_items())
+    for field, content in other.field_items():
+        fields.setdefault(field, content)
+    return BibtexEntry.from_fields(entry.key, entry.type, fields)
+
+
+def merge(sources, policy='first'):
+    return BibtexMerger(policy).merge(sources)
@@ -0,0 +1,75 @@
+import os
+import mmap
+import marshal
+from bisect import bisect_left
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from BibtexEntry import BibtexEntry
+from BibtexStats import BibtexStats
+from BibtexTokenizer import BibtexTokenizer
+
+tokenizer = BibtexTokenizer(binary=True)
+# files are not split into chunks smaller than this
+min_chunk_size = 1 << 20
+
+
+def parse_chunk(filename: str, start: int, limit: int, count_calls=False):
+    # the entries are sent back as marshalled states, which is much faster to load than pickled objects,
+    # with the number of regex calls if count_calls, as the stats of the parser are not in this process
+    stats = BibtexStats() if count_calls else None
+    chunk_tokenizer = stats.instrument(tokenizer) if count_calls else tokenizer
+    with open(filename, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            entries, starts, stop = chunk_tokenizer.parse_range(buffer, start, limit)
+    calls = stats.counters['regex_calls'] if count_calls else 0
+    return marshal.dumps([entry.__getstate__() for entry in entries]), starts, stop, calls
+
+
+def load_entries(data: bytes):
+    return [BibtexEntry.from_state(state) for state in marshal.loads(data)]
+
+
+def parse_parallel(filename: str, workers=None, chunks_per_worker=4, stats=None):
+    # Every chunk is scanned from its first byte on. If the last entry of a chunk reaches into the next
+    # one, the next chunk's scan may have started inside that entry, so its results are only used from
+    # the first entry that the serial scan from the end of the previous entry also finds. With stats, the
+    # regex calls of all chunks and serial scans are added to its counters.
+    size = os.path.getsize(filename)
+    if size == 0:
+        return []
+    workers = workers or os.cpu_count() or 1
+    num_chunks = max(1, min(workers * chunks_per_worker, size // min_chunk_size))
+    count_calls = stats is not None
+    if workers == 1 or num_chunks == 1:
+        chunk_data, _, _, calls = parse_chunk(filename, 0, size, count_calls)
+        if count_calls:
+            stats.count('regex_calls', calls)
+        return load_entries(chunk_data)
+    serial_tokenizer = stats.instrument(tokenizer) if count_calls else tokenizer
+    bounds = [size * i // num_chunks for i in range(num_chunks + 1)]
+    entries = []
+    with open(filename, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            pos = 0
+            results = executor.map(parse_chunk, repeat(filename), bounds[:-1], bounds[1:], repeat(count_calls))
+            for start, limit, (chunk_data, chunk_starts, chunk_stop, calls) in zip(bounds[:-1], bounds[1:], results):
+                if count_calls:
+                    stats.count('regex_calls', calls)
+                chunk_entries = load_entries(chunk_data)
+                if pos <= start:
+                    entries += chunk_entries
+                    pos = chunk_stop
+                    continue
+                while True:
+                    at = buffer.find(b'@', pos, limit)
+                    if at < 0:
+                        break
+                    idx = bisect_left(chunk_starts, at)
+                    if idx < len(chunk_starts) and chunk_starts[idx] == at:
+                        entries += chunk_entries[idx:]
+                        pos = chunk_stop
+                        break
+                    serial_entries, _, pos = serial_tokenizer.parse_range(buffer, at, at + 1)
+                    entries += serial_entries
+    return entries
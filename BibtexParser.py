@@ -1,23 +1,277 @@
 import re
 import os
+import io
+import sys
 import subprocess
 import platform
-from BibtexEntry import BibtexEntry
+import mmap
+from contextlib import nullcontext
+from collections import Counter
+from BibtexEntry import BibtexEntry, EntryWatch
+from BibtexLazy import parse_lazy
+from BibtexTokenizer import BibtexTokenizer
+from BibtexWriter import dump, iter_serialize, write_file
+from BibtexBuild import BibtexBuilder
+from BibtexCache import BibtexCache
+from BibtexColumns import BibtexColumns
+from BibtexDuplicates import DuplicateFinder
+from BibtexCitations import CitationScanner, find_files, regex_citation
+from BibtexParallel import parse_parallel
+from BibtexPipeline import BibtexPipeline
+from BibtexSnapshot import BibtexSnapshot
+from BibtexStats import BibtexStats
+from BibtexQuery import BibtexIndex, FieldEquals, FieldContains, TypeEquals
 
 
 class BibtexParser:
+    tokenizer = BibtexTokenizer()
+    binary_tokenizer = BibtexTokenizer(binary=True)
+
     def __init__(self, entries=None):
         self.entries = [] if entries is None else entries
         self.regex_type_key = re.compile(r'\s*@(?P<type>(.*?))\s*\{\s*(?P<key>(.*?))\s*,')
         self.regex_field_content = re.compile(r'^\s*(?P<field>(\w+))\s*=\s*\{(?P<content>(.*))\}')
-        self.get_citation = re.compile(r'(?<!\\)%.*|(\\(?:no)?cite\w*\{(?P<keys>((?!\*)[^{}]+))\})')
+        self.get_citation = regex_citation
         self.current_iter = 0
-
-    def parse(self, filename: str, append=False):
+        self._key_index = None
+        self._indexed_entries = None
+        self._indexed_length = 0
+        self._key_watch = None
+        self._field_index = None
+        self._source_filename = None
+        self._source_entries = []
+        self._snapshot = None
+        self._citation_scanner = None
+        self._columns = None
+        self.stats = None
+
+    def parse(self, filename: str, append=False, engine='tokenizer', workers=None, cache=None, lazy=False, columns=False):
+        # cache may be True for the default BibtexCache or a BibtexCache with its own directory
+        # with lazy, the fields of an entry are only split when they are used, see LazyBibtexEntry
+        # with columns, the entries are stored in columns, see use_columns
         assert os.path.isfile(filename)
         if not append:
             self.entries = []
-        file = open(filename, 'r', encoding='utf8')
+        entries = self._parse(filename, engine, workers, cache, lazy)
+        self.entries += entries
+        if columns or self._columns is not None:
+            replaced = self._move_to_columns()
+            entries = [replaced.get(id(entry), entry) for entry in entries]
+        # the next reload() of the file compares it with these entries
+        self._source_filename, self._source_entries, self._snapshot = filename, entries, None
+        if self.stats is not None:
+            self.stats.count('bytes_read', os.path.getsize(filename))
+            self.stats.count('entries_parsed', len(entries))
+            if not lazy:
+                self.stats.count('fields_parsed', sum(map(len, entries)))
+            if self.stats.entry_hooks:
+                for entry in entries:
+                    self.stats.entry(entry, 'parse')
+            self.stats.file(filename, 'parse')
+
+    def _parse(self, filename: str, engine, workers, cache, lazy):
+        if lazy:
+            if engine != 'tokenizer' or workers not in (None, 1) or cache not in (None, False):
+                raise ValueError('lazy parsing is only supported by the tokenizer engine without workers and cache')
+            with open(filename, 'rb') as file:
+                with self._phase('read'):
+                    buffer = file.read()
+            with self._phase('tokenize'):
+                return list(parse_lazy(buffer, self.binary_tokenizer))
+        if cache is None or cache is False:
+            return self._parse_entries(filename, engine, workers)
+        if engine == 'lines':
+            raise ValueError('caching is not supported by the lines engine')
+        if cache is True:
+            cache = BibtexCache()
+        with self._phase('cache'):
+            entries = cache.load(filename)
+        if self.stats is not None:
+            self.stats.count('cache_hits' if entries is not None else 'cache_misses')
+        if entries is None:
+            with self._phase('cache'):
+                stat, digest = os.stat(filename), cache.hash_file(filename)
+            entries = self._parse_entries(filename, engine, workers)
+            with self._phase('cache'):
+                try:
+                    cache.store(filename, entries, stat, digest)
+                except OSError:
+                    pass
+        return entries
+
+    def _parse_entries(self, filename: str, engine, workers):
+        if workers is not None and workers != 1:
+            # workers=0 uses all cores; the chunks are always tokenized from memory-mapped bytes
+            if engine == 'lines':
+                raise ValueError('parallel parsing is not supported by the lines engine')
+            with self._phase('tokenize'):
+                return parse_parallel(filename, workers, stats=self.stats)
+        if engine == 'tokenizer':
+            with open(filename, 'r', encoding='utf8') as file:
+                with self._phase('read'):
+                    buffer = file.read()
+            with self._phase('tokenize'):
+                return list(self.tokenizer.parse(buffer))
+        with self._phase('tokenize'):
+            return list(self.iterparse(filename, engine))
+
+    def enable_stats(self, stats=None):
+        # Collects timings, counters and hooks in a BibtexStats, see there. The tokenizers of this parser
+        # are replaced by copies counting their regex calls, which lazy entries and reloads use as well;
+        # the workers of parallel parses count their own calls and send them back. The lines engine does not
+        # use the tokenizers and adds no regex calls. Without stats nothing is measured.
+        self.stats = stats if stats is not None else BibtexStats()
+        self.tokenizer = self.stats.instrument(BibtexParser.tokenizer)
+        self.binary_tokenizer = self.stats.instrument(BibtexParser.binary_tokenizer)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+        self.__dict__.pop('tokenizer', None)
+        self.__dict__.pop('binary_tokenizer', None)
+
+    def _phase(self, name: str):
+        return self.stats.phase(name) if self.stats is not None else nullcontext()
+
+    def iterparse(self, filename_or_stream, engine='tokenizer'):
+        if engine == 'mmap':
+            yield from self._iter_mmap(filename_or_stream)
+        elif filename_or_stream == '-':
+            yield from self._iterparse_stream(sys.stdin, engine)
+        elif isinstance(filename_or_stream, (str, os.PathLike)):
+            assert os.path.isfile(filename_or_stream)
+            with open(filename_or_stream, 'r', encoding='utf8') as file:
+                yield from self._iterparse_stream(file, engine)
+        else:
+            stream = filename_or_stream
+            if not isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+                yield from self._iterparse_stream(stream, engine)
+                return
+            stream = io.TextIOWrapper(stream, encoding='utf8')
+            try:
+                yield from self._iterparse_stream(stream, engine)
+            finally:
+                stream.detach()
+
+    def _iterparse_stream(self, stream, engine):
+        if engine == 'tokenizer':
+            yield from self.tokenizer.iterparse(stream)
+        elif engine == 'lines':
+            yield from self._iter_lines(stream)
+        else:
+            raise ValueError('unknown parse engine ' + str(engine))
+
+    def _iter_mmap(self, filename_or_file):
+        if isinstance(filename_or_file, (str, os.PathLike)):
+            assert os.path.isfile(filename_or_file)
+            with open(filename_or_file, 'rb') as file:
+                yield from self._iter_mmap(file)
+            return
+        fileno = filename_or_file.fileno()
+        if os.fstat(fileno).st_size == 0:
+            return
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+            yield from self.binary_tokenizer.parse(buffer)
+
+    def reload(self, filename=None):
+        # Re-reads filename (by default the file of the last parse or reload) and updates the entries that
+        # came from it. Only the part of the file that changed since the previous reload is tokenized
+        # again, see BibtexSnapshot, and unchanged entries keep their BibtexEntry objects. parse() records
+        # no spans, so the first reload after it tokenizes the whole file and keeps the objects of the
+        # entries that are still equal. Entries that did not come from the file, e.g. appended ones, are
+        # kept and entries removed from the parser stay removed. A changed entry takes the place of the
+        # old one, an added one is put after the entry before it in the file. Returns the added entries,
+        # the entries that replaced an entry with the same key and the removed entries.
+        if filename is None:
+            filename = self._source_filename
+        assert filename is not None and os.path.isfile(filename)
+        old_entries = self._source_entries if filename == self._source_filename else []
+        snapshot = self._snapshot if filename == self._source_filename else None
+        if snapshot is None:
+            snapshot = BibtexSnapshot(self.binary_tokenizer)
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                new_entries, removed_entries = snapshot.update(b'')
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    new_entries, removed_entries = snapshot.update(buffer)
+        if snapshot is not self._snapshot and old_entries:
+            new_entries, removed_entries = self._reuse_equal_entries(snapshot, old_entries)
+        self._replace_source_entries(old_entries, snapshot.entries)
+        if self._columns is not None:
+            replaced = self._move_to_columns()
+            snapshot.entries[:] = [replaced.get(id(entry), entry) for entry in snapshot.entries]
+            new_entries = [replaced.get(id(entry), entry) for entry in new_entries]
+        self._source_filename, self._source_entries, self._snapshot = filename, list(snapshot.entries), snapshot
+        self._invalidate_index()
+        removed_keys = set(entry.key for entry in removed_entries)
+        added = [entry for entry in new_entries if entry.key not in removed_keys]
+        changed = [entry for entry in new_entries if entry.key in removed_keys]
+        changed_keys = set(entry.key for entry in changed)
+        removed = [entry for entry in removed_entries if entry.key not in changed_keys]
+        return added, changed, removed
+
+    @staticmethod
+    def _reuse_equal_entries(snapshot, old_entries):
+        # puts the old entries that equal a newly parsed one into the snapshot instead of the new one
+        unchanged = {}
+        for entry in old_entries:
+            unchanged.setdefault((entry.key, entry.type, tuple(entry.field_items())), []).append(entry)
+        for reused in unchanged.values():
+            reused.reverse()
+        for idx, entry in enumerate(snapshot.entries):
+            reused = unchanged.get((entry.key, entry.type, tuple(entry.field_items())))
+            if reused:
+                snapshot.entries[idx] = reused.pop()
+        old_ids = set(map(id, old_entries))
+        kept = set(map(id, snapshot.entries))
+        return [entry for entry in snapshot.entries if id(entry) not in old_ids], \
+               [entry for entry in old_entries if id(entry) not in kept]
+
+    def _replace_source_entries(self, old_entries, new_entries):
+        if self.entries == old_entries:
+            self.entries = list(new_entries)
+            return
+        old_ids, new_ids = set(map(id, old_entries)), set(map(id, new_entries))
+        present = set(map(id, self.entries))
+        removed_by_key = {}
+        for entry in old_entries:
+            if id(entry) not in new_ids and id(entry) in present:
+                removed_by_key.setdefault(entry.key, entry)
+        replacements, following, first = {}, {}, None
+        for idx, entry in enumerate(new_entries):
+            if id(entry) in old_ids: continue
+            replaced = removed_by_key.pop(entry.key, None)
+            if replaced is not None:
+                replacements[id(replaced)] = entry
+            elif idx == 0:
+                first = entry
+            else:
+                following[id(new_entries[idx - 1])] = entry
+        entries, added = [], set()
+        def add(entry):
+            while entry is not None:
+                entries.append(entry)
+                added.add(id(entry))
+                entry = following.pop(id(entry), None)
+        for entry in self.entries:
+            if id(entry) not in old_ids:
+                entries.append(entry)
+                continue
+            if first is not None:
+                add(first)
+                first = None
+            if id(entry) in new_ids:
+                add(entry)
+            elif id(entry) in replacements:
+                add(replacements[id(entry)])
+        # entries following one that is not in the parser, e.g. all entries of a file not loaded before
+        for entry in new_entries:
+            if id(entry) not in old_ids and id(entry) not in added:
+                add(entry)
+        self.entries = entries
+
+    def _iter_lines(self, file):
         opening_brackets, closing_brackets = 0, 0
         entry = ''
         while True:
@@ -33,70 +287,81 @@ class BibtexParser:
                 entry = entry.replace('\n', '')
                 if entry[-1] == '}':
                     entry = entry[:-1]
-                e = self.regex_type_key.search(entry)
-                if not e: continue
-                e_dict = e.groupdict()
-                bibtexEntry = BibtexEntry(key=e_dict['key'], entryType=e_dict['type'])
-                entry = entry[e.end():]
-                entry_split = []
-                idx_prev = 0
-                opened, closed = 0, 0
-                for i, char in enumerate(entry):
-                    if char == '{':
-                        opened +=1
-                    elif char == '}':
-                        closed += 1
-                    if opened > 0 and opened == closed:
-                        entry_split.append(entry[idx_prev:i+1])
-                        idx_prev = i + 2
-                        opened, closed = 0, 0
-                for e in entry_split:
-                    field = self.regex_field_content.search(e)
-                    if field:
-                        dict = field.groupdict()
-                        bibtexEntry.set_field(dict['field'], dict['content'])
-                self.entries.append(bibtexEntry)
+                bibtexEntry = self._parse_entry(entry)
+                if bibtexEntry is None: continue
+                yield bibtexEntry
                 entry = ''
                 opening_brackets, closing_brackets = 0, 0
-        file.close()
 
-    def write(self, filename: str, pretty_print=True, append=False):
-        with open(filename, 'a+' if append else 'w+', encoding='utf8') as file:
-            for entry in self.entries:
-                output = ''
-                output += '@' + entry.type + '{' + entry.key + ',\n'
-                num_spaces = 0
-                if pretty_print:
-                    for field in entry.fields:
-                        if len(field) > num_spaces:
-                            num_spaces = len(field)
-                for i, field in enumerate(entry.fields):
-                    output += ' ' * 4 + field
-                    if pretty_print:
-                        output += ' ' * (num_spaces-len(field))
-                    output += ' = ' + '{' + entry.fields[field] + '}'
-                    if i < len(entry) - 1:
-                        output += ','
-                    output += '\n'
-                output += '}\n\n'
-                file.write(output)
+    def _parse_entry(self, entry: str):
+        e = self.regex_type_key.search(entry)
+        if not e: return None
+        e_dict = e.groupdict()
+        bibtexEntry = BibtexEntry(key=e_dict['key'], entryType=e_dict['type'])
+        entry = entry[e.end():]
+        entry_split = []
+        idx_prev = 0
+        opened, closed = 0, 0
+        for i, char in enumerate(entry):
+            if char == '{':
+                opened +=1
+            elif char == '}':
+                closed += 1
+            if opened > 0 and opened == closed:
+                entry_split.append(entry[idx_prev:i+1])
+                idx_prev = i + 2
+                opened, closed = 0, 0
+        for e in entry_split:
+            field = self.regex_field_content.search(e)
+            if field:
+                dict = field.groupdict()
+                bibtexEntry.set_field(dict['field'], dict['content'])
+        return bibtexEntry
+
+    def write(self, filename: str, pretty_print=True, append=False, atomic=False):
+        if self.stats is None:
+            write_file(self.entries, filename, pretty_print, append, atomic)
+            return
+        with self._phase('write'):
+            write_file(self._iter_written(), filename, pretty_print, append, atomic)
+        self.stats.file(filename, 'write')
+
+    def _iter_written(self):
+        for entry in self.entries:
+            self.stats.count('entries_written')
+            self.stats.entry(entry, 'write')
+            yield entry
+
+    def dump(self, stream, pretty_print=True):
+        dump(self.entries, stream, pretty_print)
+
+    def iter_serialize(self, pretty_print=True):
+        return iter_serialize(self.entries, pretty_print)
 
     def append_entries(self, entries):
+        index = self._get_key_index()
         self.entries += entries
+        appended = self.entries[self._indexed_length:]
+        for position, entry in enumerate(appended, self._indexed_length):
+            index.setdefault(entry.key, position)
+        self._key_watch.add(appended)
+        self._indexed_length = len(self.entries)
 
     def add_entries(self, entries, replace=True):
         if not replace:
             self.append_entries(entries)
         else:
-            keys = self.get_all_keys()
             for entry in entries:
-                if entry.key in keys:
-                    self.entries[keys.index(entry.key)] = entry
+                idx = self.get_index_of_key(entry.key)
+                if idx != -1:
+                    self.entries[idx] = entry
+                    self._key_watch.add([entry])
+                    self._drop_field_index()
                 else:
-                    self.entries.append(entry)
+                    self.append_entries([entry])
 
     def append_entry(self, entry):
-        self.entries += [entry]
+        self.append_entries([entry])
 
     def add_endtry(self, entry, replace=True):
         self.add_entries([entry], replace)
@@ -151,23 +416,28 @@ class BibtexParser:
 
     def __setitem__(self, index, entry):
         self.entries[index] = entry
+        self._invalidate_index()
 
     def __len__(self):
         return len(self.entries)
 
     def __contains__(self, item):
         if type(item) == str:
-            return item in self.get_all_keys()
+            return self.get_index_of_key(item) != -1
         elif isinstance(item, BibtexEntry):
-            return item in self.entries
+            return self._get_position_of_entry(item) != -1
         return False
 
     def __delitem__(self, item):
-        keys = self.get_all_keys()
-        if type(item) == str and item in keys:
-            del self.entries[keys.index(item)]
-        elif type(item).__name__ == 'BibtexEntry' and item in self:
-            del item
+        if type(item) == str:
+            idx = self.get_index_of_key(item)
+        elif isinstance(item, BibtexEntry):
+            idx = self._get_position_of_entry(item)
+        else:
+            return
+        if idx != -1:
+            del self.entries[idx]
+            self._invalidate_index()
 
     def __copy__(self):
         return BibtexParser(self.entries)
@@ -177,105 +447,159 @@ class BibtexParser:
         bibtex.entries += [entry.__deepcopy__() for entry in self.entries]
         return bibtex
 
+    def to_columns(self):
+        # columnar copy of the entries for bulk filters and aggregations, see BibtexColumns; its entries
+        # read and write the copy
+        return BibtexColumns(self.entries)
+
+    def use_columns(self):
+        # Stores the entries in a BibtexColumns: they are replaced by ColumnEntry views of its rows, which read
+        # and write the columns, so the columns always hold the current keys, types and fields. Entries
+        # added, removed or reordered are noticed the next time columns is used, which then moves the rows;
+        # added entries are replaced by views of their rows then.
+        if self._columns is None:
+            self._move_to_columns()
+        return self.columns
+
+    @property
+    def columns(self):
+        # the BibtexColumns holding the entries in the same order, so rows are positions in entries,
+        # None unless use_columns was called
+        if self._columns is not None and self._columns.entries != self.entries:
+            self._move_to_columns()
+        return self._columns
+
+    def _move_to_columns(self):
+        # returns the views that replaced entries by the ids of the entries
+        columns = BibtexColumns(self.entries, previous=self._columns)
+        replaced = {id(entry): view for entry, view in zip(self.entries, columns.entries) if entry is not view}
+        self._columns = columns
+        if replaced:
+            self.entries[:] = columns.entries
+            self._invalidate_index()
+        return replaced
+
     def get_all_keys(self):
         return [entry.key for entry in self.entries]
 
     def get_entry(self, key: str):
-        keys = self.get_all_keys()
-        return self.entries[keys.index(key)] if key in keys else None
+        idx = self.get_index_of_key(key)
+        return self.entries[idx] if idx != -1 else None
+
+    def query(self, predicate):
+        positions = predicate.positions(self._get_field_index())
+        return BibtexParser([self.entries[idx] for idx in sorted(positions)])
 
     def get_entries_where_field_equals_content(self, field, content):
-        entries = []
-        for entry in self.entries:
-            if field in entry.fields:
-                if entry.contents[entry.fields.index(field)] == content:
-                    entries.append(entry)
-        return BibtexParser(entries)
+        return self.query(FieldEquals(field, content))
 
     def get_entries_in_year(self, year):
         return self.get_entries_where_field_equals_content('year', str(year))
 
     def get_entries_where_content_is_in_field(self, content, field):
-        entries = []
-        for entry in self.entries:
-            if field in entry.fields:
-                if content in entry.contents[entry.fields.index(field)]:
-                    entries.append(entry)
-        return BibtexParser(entries)
+        return self.query(FieldContains(field, content))
 
     def get_entries_with_author(self, author):
         return self.get_entries_where_content_is_in_field(author, 'author')
 
     def set_order_of_fields(self, order: list, keys=None):
-        if keys is None:
-            keys = self.get_all_keys()
-        for entry in self.entries:
-            if entry.key in keys:
-                entry.set_order_of_fields(order)
+        BibtexPipeline().set_order_of_fields(order, keys).apply(self)
 
     def set_field_last(self, field: str):
-        for entry in self.entries:
-            entry.set_field_last(field)
+        BibtexPipeline().set_field_last(field).apply(self)
 
     def use_field_in_field_as_href(self, from_field='url', to_field='title', keys=None, remove_from_field=True, exclude_types=None):
-        if keys is None:
-            keys = self.get_all_keys()
-        if exclude_types is None:
-            exclude_types = []
-        exclude_types = [tpe.lower() for tpe in exclude_types]
-        for entry in self.entries:
-            if entry.key in keys:
-                if entry.type.lower() not in exclude_types:
-                    entry.use_field_in_field_as_href(from_field, to_field, remove_from_field)
+        BibtexPipeline().use_field_in_field_as_href(from_field, to_field, keys, remove_from_field, exclude_types).apply(self)
 
     def use_url_in_title_as_href(self):
         self.use_field_in_field_as_href(from_field='url', to_field='title', keys=None, remove_from_field=True, exclude_types=None)
 
     def use_href_from_title_as_url(self, keys=None, replace=True, use_url_package=True):
-        if keys is None:
-            keys = self.get_all_keys()
-        for entry in self.entries:
-            if entry.key in keys:
-                entry.use_href_from_title_as_url(replace, use_url_package)
+        BibtexPipeline().use_href_from_title_as_url(keys, replace, use_url_package).apply(self)
 
     def sort_by_key(self, reverse=False):
         self.entries.sort(key=lambda entry: entry.key, reverse=reverse)
+        self._invalidate_index()
 
     def fix_special_characters(self, keys=None, fields=None, replace_chars=None, only_if_url_or_href=False):
-        if replace_chars is None:
-            replace_chars = [['%', '\%'], ['&', '\&']]
-        if keys is None:
-            keys = self.get_all_keys()
-        for entry in self.entries:
-            if entry.key in keys:
-                entry.fix_special_characters(fields, replace_chars, only_if_url_or_href)
+        BibtexPipeline().fix_special_characters(keys, fields, replace_chars, only_if_url_or_href).apply(self)
 
     def get_entries_with_type(self, type):
-        ret = BibtexParser()
-        type_lower = type.lower()
-        for entry in self.entries:
-            if entry.type.lower() == type_lower:
-                ret.append_entries([entry])
-        return ret
+        return self.query(TypeEquals(type))
 
     def get_index_of_key(self, key):
-        if key not in self.get_all_keys():
-            return -1
-        for idx, entry in enumerate(self.entries):
-            if entry.key == key:
+        return self._get_key_index().get(key, -1)
+
+    def _get_position_of_entry(self, entry):
+        idx = self.get_index_of_key(entry.key)
+        if idx == -1 or self.entries[idx] is entry:
+            return idx
+        for idx, other in enumerate(self.entries):
+            if other is entry:
                 return idx
+        return -1
+
+    def _get_key_index(self):
+        # like BibtexIndex.is_valid_for, only with a watch that ignores changed types and fields
+        if self._key_index is None or self._indexed_entries is not self.entries \
+                or self._indexed_length != len(self.entries) or self._key_watch.changed:
+            self._build_key_index()
+        return self._key_index
+
+    def _build_key_index(self):
+        self._drop_key_index()
+        index = {}
+        for idx, entry in enumerate(self.entries):
+            index.setdefault(entry.key, idx)
+        self._key_index = index
+        self._indexed_entries = self.entries
+        self._indexed_length = len(self.entries)
+        self._key_watch = EntryWatch(self, keys_only=True)
+        self._key_watch.add(self.entries)
+
+    def _get_field_index(self):
+        if self._field_index is None or not self._field_index.is_valid_for(self.entries):
+            self._drop_field_index()
+            self._field_index = BibtexIndex(self.entries)
+        return self._field_index
+
+    def _drop_field_index(self):
+        if self._field_index is not None:
+            self._field_index.close()
+        self._field_index = None
+
+    def _drop_key_index(self):
+        # the entries drop the watch of an index once it changed
+        if self._key_watch is not None:
+            self._key_watch.changed = True
+        self._key_index = self._key_watch = None
+
+    def _invalidate_index(self):
+        self._drop_key_index()
+        self._drop_field_index()
+
+    def invalidate_indexes(self):
+        # the indexes notice changed keys, types and fields and a list of another length by themselves,
+        # entries replaced or reordered in the list directly are only noticed after this
+        self._invalidate_index()
 
     def remove_keys(self, keys):
-        all_keys = self.get_all_keys()
-        for key in keys:
-            if not key in all_keys: continue
-            idx = self.get_index_of_key(key)
-            if idx == -1: continue
-            self.entries.pop(idx)
+        # every occurrence of a key in keys removes one entry with that key, starting with the first
+        remaining = Counter(keys)
+        entries = []
+        for entry in self.entries:
+            if remaining[entry.key] > 0:
+                remaining[entry.key] -= 1
+            else:
+                entries.append(entry)
+        self.entries[:] = entries
+        self._invalidate_index()
 
     def remove_fields_from_keys(self, fields, keys=None):
         if keys is None:
-            keys = self.get_all_keys()
+            for entry in self.entries:
+                entry.remove_fields(fields)
+            return
         for key in keys:
             idx = self.get_index_of_key(key)
             if idx == -1: continue
@@ -286,69 +610,49 @@ class BibtexParser:
 
     def remove_entries_with_type(self, type):
         type_lower = type.lower()
-        for i, entry in enumerate(self.entries):
-            if entry.type.lower() == type_lower:
-                self.entries.pop(i)
+        self.entries[:] = [entry for entry in self.entries if entry.type.lower() != type_lower]
+        self._invalidate_index()
 
     def check_for_duplicates(self):
-        keys = self.get_all_keys()
-        counted_keys = []
-        count = []
-        for key in keys:
-            if not key in counted_keys:
-                counted_keys.append(key)
-                count.append(1)
-            else:
-                count[counted_keys.index(key)] += 1
-        duplicate_keys = []
-        for i, key in enumerate(counted_keys):
-            if count[i] > 1:
-                duplicate_keys.append(key)
-        return duplicate_keys
-
-    def get_entries_cited_in_files(self, files):
-        all_keys = self.get_all_keys()
-        out = BibtexParser()
-        keys = []
-        for file in files:
-            if not os.path.isfile(file): continue
-            try:
-                with open(file, 'r', encoding='utf8') as input_file:
-                    while True:
-                        line = input_file.readline()
-                        if not line: break
-                        match = self.get_citation.search(line)
-                        if not match: continue
-                        matched_keys = match.groupdict()['keys']
-                        if not matched_keys: continue
-                        matched_keys = matched_keys.split(',')
-                        matched_keys = [key.strip() for key in matched_keys]
-                        for key in matched_keys:
-                            if key not in all_keys or key in keys: continue
-                            keys.append(key)
-                            out.append_entries([self.entries[all_keys.index(key)]])
-            except UnicodeDecodeError:
-                continue
-        return out
-
-    def get_entries_cited_in_folders(self, folders, include_subfolders=False, file_extensions=None):
-        if file_extensions is None:
-            file_extensions = ['.tex']
-        tex_files = []
-        def _append_file(file):
-            if os.path.isdir(file): return
-            _, ext = os.path.splitext(file)
-            if file_extensions is not None and ext not in file_extensions: return
-            tex_files.append(file)
-        for folder in folders:
-            if include_subfolders:
-                for root, dirs, files in os.walk(folder):
-                    for file in files:
-                        _append_file(os.path.join(root, file))
-            else:
-                for file in os.listdir(folder):
-                    _append_file(os.path.join(folder, file))
-        return self.get_entries_cited_in_files(tex_files)
+        count = Counter(entry.key for entry in self.entries)
+        return [key for key in count if count[key] > 1]
+
+    def find_near_duplicates(self, threshold=0.8):
+        # entries with similar titles, authors and years, see DuplicateFinder; returns (entries, score) pairs
+        clusters = DuplicateFinder(threshold).find(self.entries)
+        return [([self.entries[idx] for idx in positions], score) for positions, score in clusters]
+
+    def get_entries_cited_in_files(self, files, scanner=None):
+        # scanner defaults to a CitationScanner kept by this parser, so repeated calls reuse its cache
+        if scanner is None:
+            scanner = self._get_citation_scanner()
+        cited = []
+        keys = set()
+        files_scanned, cache_hits = scanner.files_scanned, scanner.cache_hits
+        with self._phase('scan'):
+            keys_of_files = scanner.scan(files)
+        if self.stats is not None:
+            self.stats.count('files_scanned', scanner.files_scanned - files_scanned)
+            self.stats.count('scan_cache_hits', scanner.cache_hits - cache_hits)
+            for filename in files:
+                self.stats.file(filename, 'scan')
+        with self._phase('resolve'):
+            for file_keys in keys_of_files:
+                for key in file_keys:
+                    if key in keys: continue
+                    idx = self.get_index_of_key(key)
+                    if idx == -1: continue
+                    keys.add(key)
+                    cited.append(self.entries[idx])
+        return BibtexParser(cited)
+
+    def get_entries_cited_in_folders(self, folders, include_subfolders=False, file_extensions=None, scanner=None):
+        return self.get_entries_cited_in_files(find_files(folders, include_subfolders, file_extensions), scanner)
+
+    def _get_citation_scanner(self):
+        if self._citation_scanner is None:
+            self._citation_scanner = CitationScanner()
+        return self._citation_scanner
 
     def get_keys_cited_in_files(self, files):
         return [entry.key for entry in self.get_entries_cited_in_files(files)]
@@ -357,59 +661,20 @@ class BibtexParser:
         return ', '.join(self.get_keys_cited_in_files(files))
 
     def get_keys_cited_in_folder(self, folders, include_subfolders=False, file_extensions=None):
-        return [entry.keys for entry in self.get_entries_cited_in_folders(folders, include_subfolders, file_extensions)]
+        return [entry.key for entry in self.get_entries_cited_in_folders(folders, include_subfolders, file_extensions)]
 
     def get_string_of_keys_cited_in_folder(self, folders, include_subfolders=False, file_extensions=None):
         return ', '.join(self.get_keys_cited_in_folder(folders, include_subfolders, file_extensions))
 
-    def create_pdf(self, output_filename, open_file=False):
-        output_filename, ext = os.path.splitext(output_filename)
-        ext = '.tex'
-        output_dir = os.path.dirname(output_filename)
-        if not os.path.isdir(output_dir):
-            os.mkdir(output_dir)
-        bib_filename = os.path.join(output_dir, 'references_tmp.bib')
-        tex = '\\documentclass{article}\n\n'
-        tex += '\\usepackage[utf8]{inputenc}\n\\usepackage[T1]{fontenc}\n\\usepackage[english]{babel}\n\\usepackage{amsmath,amssymb}\n\\usepackage{xcolor}\n\\usepackage[backend=biber,sorting=none,style=reading]{biblatex}\n\\usepackage{hyperref}\n\\usepackage[margin=2cm, includefoot]{geometry}\n\n'
-        tex += '\\addbibresource[]{references_tmp.bib}\n\n'
-        tex += '\\hypersetup{\n\tcolorlinks,\n\tcitecolor = black,\n\tfilecolor = black,\n\turlcolor = blue!50!black,\n\tpdfstartview = FitH\n}\n\n'
-        tex += '\\begin{document}\n\t\\nocite{*}\n\t\\printbibliography\n\end{document}\n'
-        self.write(bib_filename)
-        with open(output_filename + ext, 'w+', encoding='utf8') as out:
-            out.write(tex)
-        self._compile_tex_file(output_filename + ext)
-        self._run_biber(output_filename)
-        self._compile_tex_file(output_filename + ext)
-        returncode = self._compile_tex_file(output_filename + ext)
-        pdf_created = returncode == 0
-        os.remove(bib_filename)
-        for ext in ['.tex', '.log', '.aux', '.bcf', '.out', '.run.xml', '.bbl', '.blg']:
-            try:
-                os.remove(output_filename + ext)
-            except Exception as ee:
-                continue
-        if pdf_created:
-            if open_file:
-                self._start_file(output_filename + '.pdf')
-        else:
-            try:
-                os.remove(output_filename + '.pdf')
-            except Exception as e:
-                pass
+    def create_pdf(self, output_filename, open_file=False, builder=None):
+        # see BibtexBuilder, which also builds many bibliographies at once
+        if builder is None:
+            builder = BibtexBuilder()
+        pdf_created = builder.build(self.entries, output_filename)
+        if pdf_created and open_file:
+            self._start_file(os.path.splitext(output_filename)[0] + '.pdf')
         return pdf_created
 
-    @staticmethod
-    def _compile_tex_file(output_filename):
-        proc = subprocess.Popen(['pdflatex', '-interaction=nonstopmode', '-halt-on-error', output_filename], stdout=None)
-        proc.communicate()
-        return proc.returncode
-
-    @staticmethod
-    def _run_biber(output_filename):
-        proc = subprocess.Popen(['biber', output_filename], stdout=None)
-        proc.communicate()
-        return proc.returncode
-
     @staticmethod
     def _start_file(filename):
         if platform.system() == 'Darwin':  # macOS
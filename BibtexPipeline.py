@@ -0,0 +1,112 @@
+from BibtexEntry import get_url_from_latex_url, get_url_from_href, get_title_from_href, get_replacer, get_fixed_contents
+
+
+class BibtexPipeline:
+    # Records transformations with the same arguments as the BibtexParser methods of the same name and
+    # applies all of them to an entry at once: the fields of the entry are copied into a dict, every step
+    # edits that dict and the result is stored back in the entry if it differs. Key filters are sets.
+    # Entries not selected by any step or not changed by the steps are left untouched.
+    def __init__(self):
+        self.steps = []
+        self.excluded_types = set()
+        self.sort_reverse = None
+
+    def use_field_in_field_as_href(self, from_field='url', to_field='title', keys=None, remove_from_field=True, exclude_types=None):
+        exclude_types = set(tpe.lower() for tpe in exclude_types) if exclude_types else None
+        def step(entry, fields):
+            if exclude_types is not None and entry.type.lower() in exclude_types: return
+            if from_field not in fields or to_field not in fields: return
+            from_content = fields[from_field]
+            if '\\url{' in from_content:
+                from_content = get_url_from_latex_url.search(from_content).group(1)
+            fields[to_field] = '\\href{' + from_content + '}{' + fields[to_field] + '}'
+            if remove_from_field:
+                del fields[from_field]
+        return self._add_step(step, keys)
+
+    def use_url_in_title_as_href(self):
+        return self.use_field_in_field_as_href(from_field='url', to_field='title')
+
+    def use_href_from_title_as_url(self, keys=None, replace=True, use_url_package=True):
+        def step(entry, fields):
+            if 'title' not in fields: return
+            url = get_url_from_href.search(fields['title'])
+            if url is None: return
+            title = get_title_from_href.search(fields['title'])
+            if title is None: return
+            url = '\\url{' + url.group(1) + '}' if use_url_package else url.group(1)
+            if replace or 'url' not in fields:
+                fields['url'] = url
+            fields['title'] = title.group(1)
+        return self._add_step(step, keys)
+
+    def set_order_of_fields(self, order: list, keys=None):
+        order = list(dict.fromkeys(order))
+        def step(entry, fields):
+            ordered = {field: fields[field] for field in order if field in fields}
+            if len(ordered) < len(fields):
+                for field, content in fields.items():
+                    ordered.setdefault(field, content)
+            fields.clear()
+            fields.update(ordered)
+        return self._add_step(step, keys)
+
+    def set_field_last(self, field: str):
+        def step(entry, fields):
+            if field in fields:
+                fields[field] = fields.pop(field)
+        return self._add_step(step, None)
+
+    def fix_special_characters(self, keys=None, fields=None, replace_chars=None, only_if_url_or_href=False):
+        replacer = get_replacer(replace_chars)
+        selected = frozenset(fields) if fields is not None else None
+        def step(entry, fields):
+            fields.update(get_fixed_contents(fields.items(), replacer, selected, only_if_url_or_href))
+        return self._add_step(step, keys)
+
+    def remove_fields(self, fields, keys=None):
+        def step(entry, entry_fields):
+            for field in fields:
+                entry_fields.pop(field, None)
+        return self._add_step(step, keys)
+
+    def remove_entries_with_type(self, type):
+        self.excluded_types.add(type.lower())
+        return self
+
+    def sort_by_key(self, reverse=False):
+        # sorting needs all entries, so it is done after the other steps
+        self.sort_reverse = reverse
+        return self
+
+    def _add_step(self, step, keys):
+        self.steps.append((step, frozenset(keys) if keys is not None else None))
+        return self
+
+    def apply_to_entry(self, entry):
+        # returns False if the entry is removed by the pipeline
+        if self.excluded_types and entry.type.lower() in self.excluded_types:
+            return False
+        steps = [step for step, keys in self.steps if keys is None or entry.key in keys]
+        if not steps:
+            return True
+        items = tuple(entry.field_items())
+        fields = dict(items)
+        for step in steps:
+            step(entry, fields)
+        if tuple(fields.items()) != items:
+            entry.set_fields(fields)
+        return True
+
+    def iterate(self, entries):
+        # transforms entries lazily, e.g. those of BibtexParser.iterparse, unless they have to be sorted
+        entries = (entry for entry in entries if self.apply_to_entry(entry))
+        if self.sort_reverse is None:
+            return entries
+        return iter(sorted(entries, key=lambda entry: entry.key, reverse=self.sort_reverse))
+
+    def apply(self, bibtex):
+        # transforms the entries of a BibtexParser in place
+        bibtex.entries[:] = self.iterate(bibtex.entries)
+        bibtex.invalidate_indexes()
+        return bibtex
@@ -0,0 +1,167 @@
+import re
+from BibtexEntry import EntryWatch
+
+
+class BibtexIndex:
+    def __init__(self, entries):
+        self.entries = entries
+        self.length = len(entries)
+        self.watch = EntryWatch(self)
+        self.watch.add(entries)
+        self.regex_token = re.compile(r'\w+')
+        self.hash_indexes = {}
+        self.token_indexes = {}
+        self.token_matches = {}
+
+    def is_valid_for(self, entries):
+        # Changed keys, types and fields of the entries are noticed by the EntryWatch of the index, a list that
+        # was replaced or changed its length by comparing it with the indexed one. Entries replaced or
+        # reordered in the list directly are not noticed, see BibtexParser.invalidate_indexes.
+        return not self.watch.changed and self.entries is entries and self.length == len(entries)
+
+    def close(self):
+        # the entries drop the watch of the index once it changed
+        self.watch.changed = True
+
+    def get_hash_index(self, field):
+        index = self.hash_indexes.get(field)
+        if index is None:
+            index = {}
+            for position, entry in enumerate(self.entries):
+                if entry.has_field(field):
+                    index.setdefault(entry.get_field(field), []).append(position)
+            self.hash_indexes[field] = index
+        return index
+
+    def get_type_index(self):
+        index = self.hash_indexes.get(None)
+        if index is None:
+            index = {}
+            for position, entry in enumerate(self.entries):
+                index.setdefault(entry.type.lower(), []).append(position)
+            self.hash_indexes[None] = index
+        return index
+
+    def get_token_index(self, field):
+        index = self.token_indexes.get(field)
+        if index is None:
+            index, present = {}, []
+            for position, entry in enumerate(self.entries):
+                if not entry.has_field(field): continue
+                present.append(position)
+                for token in set(self.regex_token.findall(entry.get_field(field))):
+                    index.setdefault(token, []).append(position)
+            index = self.token_indexes[field] = (index, present)
+        return index
+
+    def equal(self, field, content):
+        return set(self.get_hash_index(field).get(content, ()))
+
+    def with_type(self, entry_type):
+        return set(self.get_type_index().get(entry_type.lower(), ()))
+
+    def containing(self, field, content):
+        # candidates are the entries holding every word of content as a token, the first and last word
+        # may only be the end or the start of a token; the candidates are then checked with 'in'
+        tokens, present = self.get_token_index(field)
+        candidates = None
+        for word in self.regex_token.finditer(content):
+            matched = self._get_token_matches(field, tokens, word.group(), word.start() == 0, word.end() == len(content))
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return set()
+        if candidates is None:
+            candidates = present
+        return {position for position in candidates if content in self.entries[position].get_field(field)}
+
+    def _get_token_matches(self, field, tokens, word, open_start, open_end):
+        cache_key = (field, word, open_start, open_end)
+        matched = self.token_matches.get(cache_key)
+        if matched is None:
+            if not open_start and not open_end:
+                matched = set(tokens.get(word, ()))
+            else:
+                matched = set()
+                for token, positions in tokens.items():
+                    if open_start and open_end:
+                        found = word in token
+                    elif open_start:
+                        found = token.endswith(word)
+                    else:
+                        found = token.startswith(word)
+                    if found:
+                        matched.update(positions)
+            self.token_matches[cache_key] = matched
+        return set(matched)
+
+
+class Predicate:
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def positions(self, index: BibtexIndex):
+        raise NotImplementedError
+
+
+class FieldEquals(Predicate):
+    def __init__(self, field: str, content: str):
+        self.field = field
+        self.content = content
+
+    def positions(self, index: BibtexIndex):
+        return index.equal(self.field, self.content)
+
+
+class FieldContains(Predicate):
+    def __init__(self, field: str, content: str):
+        self.field = field
+        self.content = content
+
+    def positions(self, index: BibtexIndex):
+        return index.containing(self.field, self.content)
+
+
+class TypeEquals(Predicate):
+    def __init__(self, entry_type: str):
+        self.entry_type = entry_type
+
+    def positions(self, index: BibtexIndex):
+        return index.with_type(self.entry_type)
+
+
+class YearEquals(FieldEquals):
+    def __init__(self, year):
+        super().__init__('year', str(year))
+
+
+class AuthorContains(FieldContains):
+    def __init__(self, author: str):
+        super().__init__('author', author)
+
+
+class And(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def positions(self, index: BibtexIndex):
+        positions = None
+        for predicate in self.predicates:
+            matched = predicate.positions(index)
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                return set()
+        return positions if positions is not None else set()
+
+
+class Or(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def positions(self, index: BibtexIndex):
+        positions = set()
+        for predicate in self.predicates:
+            positions |= predicate.positions(index)
+        return positions
@@ -0,0 +1,119 @@
+import hashlib
+from bisect import bisect_left
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class BibtexSnapshot:
+    # Remembers the entries of a file together with their segments, i.e. the byte range from the end of
+    # the previous entry to the end of the entry, and a hash of every segment and of every block of
+    # block_size segments. update() checks the old segments against the new file from the front and from
+    # the back, so only the bytes in between are tokenized again. Since the scan of a file only depends
+    # on the position it continues from and the bytes after it, the old entries after the change are
+    # reused as soon as the new scan reaches the (shifted) start of one of the unchanged segments.
+    block_size = 64
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.size = 0
+        self.starts = []
+        self.ends = []
+        self.digests = []
+        self.entries = []
+        self.blocks = []
+        self.tail = _digest(b'')
+
+    def update(self, buffer):
+        # returns the newly parsed entries and the old entries that are gone
+        size, n = len(buffer), len(self.entries)
+        delta = size - self.size
+        prefix = self._match_prefix(buffer)
+        pos = self.ends[prefix - 1] if prefix else 0
+        suffix = self._match_suffix(buffer, prefix, pos, delta)
+        unchanged = {}
+        for k in range(prefix, n if suffix is None else suffix):
+            unchanged.setdefault(self.digests[k], []).append(self.entries[k])
+        starts, ends, digests, entries = self.starts[:prefix], self.ends[:prefix], self.digests[:prefix], self.entries[:prefix]
+        new_entries = []
+        synced = self._find_sync(pos - delta, suffix)
+        if synced is None:
+            for span in self.tokenizer.iter_spans(buffer, pos):
+                end = span[4]
+                digest = _digest(buffer[pos:end])
+                reused = unchanged.get(digest)
+                if reused:
+                    entry = reused.pop()
+                else:
+                    entry = self.tokenizer.make_entry(buffer, span)
+                    new_entries.append(entry)
+                starts.append(pos)
+                ends.append(end)
+                digests.append(digest)
+                entries.append(entry)
+                pos = end
+                synced = self._find_sync(pos - delta, suffix)
+                if synced is not None:
+                    break
+        if synced is not None:
+            starts += [start + delta for start in self.starts[synced:]]
+            ends += [end + delta for end in self.ends[synced:]]
+            digests += self.digests[synced:]
+            entries += self.entries[synced:]
+        else:
+            self.tail = _digest(buffer[pos:size])
+        kept = set(map(id, entries[prefix:]))
+        removed = [entry for entry in self.entries[prefix:] if id(entry) not in kept]
+        full_blocks = prefix // self.block_size
+        self.size, self.starts, self.ends, self.digests, self.entries = size, starts, ends, digests, entries
+        self.blocks = self.blocks[:full_blocks]
+        for block in range(full_blocks, len(entries) // self.block_size):
+            first, last = block * self.block_size, (block + 1) * self.block_size - 1
+            self.blocks.append(_digest(buffer[starts[first]:ends[last]]))
+        return new_entries, removed
+
+    def _match_prefix(self, buffer):
+        size, n, block_size = len(buffer), len(self.entries), self.block_size
+        i = 0
+        for block, digest in enumerate(self.blocks):
+            start, end = self.starts[block * block_size], self.ends[(block + 1) * block_size - 1]
+            if end > size or _digest(buffer[start:end]) != digest:
+                break
+            i = (block + 1) * block_size
+        while i < n and self.ends[i] <= size and _digest(buffer[self.starts[i]:self.ends[i]]) == self.digests[i]:
+            i += 1
+        return i
+
+    def _match_suffix(self, buffer, prefix, pos, delta):
+        # returns the first of the segments that are unchanged up to the end of the file, only shifted by
+        # delta, or None if the bytes after the last entry changed
+        size, n, block_size = len(buffer), len(self.entries), self.block_size
+        tail_start = (self.ends[-1] if n else 0) + delta
+        if tail_start < pos or _digest(buffer[tail_start:size]) != self.tail:
+            return None
+        j = n
+        while j > prefix:
+            if j % block_size == 0 and j - block_size >= prefix:
+                block = j // block_size - 1
+                start = self.starts[j - block_size] + delta
+                if start >= pos and _digest(buffer[start:self.ends[j - 1] + delta]) == self.blocks[block]:
+                    j -= block_size
+                    continue
+            start = self.starts[j - 1] + delta
+            if start < pos or _digest(buffer[start:self.ends[j - 1] + delta]) != self.digests[j - 1]:
+                break
+            j -= 1
+        return j
+
+    def _find_sync(self, old_pos, suffix):
+        # index of the unchanged segment starting at old_pos, len(entries) for the start of the tail
+        if suffix is None:
+            return None
+        n = len(self.entries)
+        if old_pos == (self.ends[-1] if n else 0):
+            return n
+        k = bisect_left(self.starts, old_pos, suffix, n)
+        if k < n and self.starts[k] == old_pos:
+            return k
+        return None
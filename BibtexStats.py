@@ -0,0 +1,95 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from BibtexTokenizer import BibtexTokenizer
+
+
+class CountingPattern:
+    # wraps a compiled regex and counts the calls of its methods in counters['regex_calls']
+    def __init__(self, pattern, counters):
+        self.pattern = pattern
+        self.counters = counters
+
+    def match(self, *args):
+        self.counters['regex_calls'] += 1
+        return self.pattern.match(*args)
+
+    def search(self, *args):
+        self.counters['regex_calls'] += 1
+        return self.pattern.search(*args)
+
+    def finditer(self, *args):
+        self.counters['regex_calls'] += 1
+        return self.pattern.finditer(*args)
+
+    def sub(self, *args):
+        self.counters['regex_calls'] += 1
+        return self.pattern.sub(*args)
+
+
+class BibtexStats:
+    # Collected by a BibtexParser after enable_stats(): the seconds spent in every phase (read, tokenize,
+    # cache, write, scan, resolve), counters (bytes_read, entries_parsed, fields_parsed, regex_calls,
+    # cache_hits, cache_misses, entries_written, files_scanned, scan_cache_hits) and hooks called with
+    # (entry, phase) for every parsed or written entry and (filename, phase) for every parsed, written or
+    # scanned file.
+    def __init__(self):
+        self.seconds = Counter()
+        self.counters = Counter()
+        self.entry_hooks = []
+        self.file_hooks = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def count(self, name: str, amount=1):
+        self.counters[name] += amount
+
+    def add_entry_hook(self, hook):
+        self.entry_hooks.append(hook)
+
+    def add_file_hook(self, hook):
+        self.file_hooks.append(hook)
+
+    def entry(self, entry, phase: str):
+        for hook in self.entry_hooks:
+            hook(entry, phase)
+
+    def file(self, filename: str, phase: str):
+        for hook in self.file_hooks:
+            hook(filename, phase)
+
+    def instrument(self, tokenizer):
+        # a copy of tokenizer whose regexes count their calls
+        counting = BibtexTokenizer(tokenizer.binary)
+        for name, value in vars(counting).items():
+            if name.startswith('regex_'):
+                setattr(counting, name, CountingPattern(value, self.counters))
+        return counting
+
+    def reset(self):
+        self.seconds.clear()
+        self.counters.clear()
+
+    def to_dict(self):
+        parse_seconds = self.seconds['read'] + self.seconds['tokenize']
+        rates = {}
+        if parse_seconds:
+            rates['entries_per_second'] = self.counters['entries_parsed'] / parse_seconds
+            rates['bytes_per_second'] = self.counters['bytes_read'] / parse_seconds
+        if self.seconds['write']:
+            rates['entries_written_per_second'] = self.counters['entries_written'] / self.seconds['write']
+        return {'seconds': dict(self.seconds), 'counters': dict(self.counters), 'rates': rates}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, sort_keys=True)
+
+    def dump(self, filename: str):
+        with open(filename, 'w', encoding='utf8') as file:
+            file.write(self.to_json())
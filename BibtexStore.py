@@ -0,0 +1,149 @@
+import sqlite3
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from BibtexWriter import dump, write_file
+
+schema = '''
+CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, key TEXT NOT NULL, type TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fields (
+    entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (entry_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_key ON entries(key);
+CREATE INDEX IF NOT EXISTS entries_type ON entries(lower(type));
+CREATE INDEX IF NOT EXISTS fields_name_content ON fields(name, content);
+'''
+
+# titles and authors for substring searches, only created if SQLite has FTS5
+fts_schema = "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(title, author, tokenize='trigram case_sensitive 1')"
+
+select_entries = '''
+SELECT entries.id, entries.key, entries.type, fields.name, fields.content
+FROM entries LEFT JOIN fields ON fields.entry_id = entries.id
+'''
+
+
+class BibtexStore:
+    # Keeps entries in an SQLite database: one row per entry, one row per field (indexed by name and
+    # content, e.g. for years and authors) and an FTS5 index of the titles and authors. The lookups and
+    # get_entries_* queries of BibtexParser run as SQL queries and return BibtexParsers; iterating
+    # fetches the entries in batches of batch_size rows.
+    def __init__(self, filename=':memory:', batch_size=1000):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(schema)
+        try:
+            self.connection.execute(fts_schema)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def import_entries(self, entries):
+        # entries may be a BibtexParser or any iterable of entries, e.g. BibtexParser.iterparse
+        with self.connection:
+            cursor = self.connection.cursor()
+            for entry in entries:
+                cursor.execute('INSERT INTO entries (key, type) VALUES (?, ?)', (entry.key, entry.type))
+                entry_id = cursor.lastrowid
+                items = list(entry.field_items())
+                cursor.executemany('INSERT INTO fields VALUES (?, ?, ?, ?)',
+                                   [(entry_id, position, field, content) for position, (field, content) in enumerate(items)])
+                if self.has_fts:
+                    fields = dict(items)
+                    cursor.execute('INSERT INTO search (rowid, title, author) VALUES (?, ?, ?)',
+                                   (entry_id, fields.get('title'), fields.get('author')))
+
+    def import_file(self, filename: str, engine='tokenizer'):
+        self.import_entries(BibtexParser().iterparse(filename, engine))
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM fields')
+            self.connection.execute('DELETE FROM entries')
+            if self.has_fts:
+                self.connection.execute('DELETE FROM search')
+
+    def __len__(self):
+        return self.connection.execute('SELECT count(*) FROM entries').fetchone()[0]
+
+    def __iter__(self):
+        return self._iter_entries(select_entries + 'ORDER BY entries.id, fields.position', ())
+
+    def __contains__(self, key):
+        return self.connection.execute('SELECT 1 FROM entries WHERE key = ? LIMIT 1', (key,)).fetchone() is not None
+
+    def get_all_keys(self):
+        return [key for key, in self.connection.execute('SELECT key FROM entries ORDER BY id')]
+
+    def get_entry(self, key: str):
+        row = self.connection.execute('SELECT min(id) FROM entries WHERE key = ?', (key,)).fetchone()
+        if row[0] is None:
+            return None
+        return next(self._iter_entries(select_entries + 'WHERE entries.id = ? ORDER BY fields.position', (row[0],)))
+
+    def get_entries_where_field_equals_content(self, field, content):
+        return self._query('SELECT entry_id FROM fields WHERE name = ? AND content = ?', (field, content))
+
+    def get_entries_in_year(self, year):
+        return self.get_entries_where_field_equals_content('year', str(year))
+
+    def get_entries_where_content_is_in_field(self, content, field):
+        # substrings of three or more characters are looked up in the FTS index, the rest are scanned
+        if self.has_fts and field in ('title', 'author') and len(content) >= 3:
+            return self._query('SELECT rowid FROM search WHERE ' + field + ' MATCH ? AND instr(' + field + ', ?) > 0',
+                               ('"' + content.replace('"', '""') + '"', content))
+        return self._query('SELECT entry_id FROM fields WHERE name = ? AND instr(content, ?) > 0', (field, content))
+
+    def get_entries_with_author(self, author):
+        return self.get_entries_where_content_is_in_field(author, 'author')
+
+    def get_entries_with_type(self, type):
+        return self._query('SELECT id FROM entries WHERE lower(type) = lower(?)', (type,))
+
+    def check_for_duplicates(self):
+        return [key for key, in self.connection.execute('SELECT key FROM entries GROUP BY key HAVING count(*) > 1 ORDER BY min(id)')]
+
+    def to_parser(self):
+        return BibtexParser(list(self))
+
+    def dump(self, stream, pretty_print=True):
+        dump(iter(self), stream, pretty_print)
+
+    def write(self, filename: str, pretty_print=True, append=False, atomic=False):
+        write_file(iter(self), filename, pretty_print, append, atomic)
+
+    def _query(self, ids_query, parameters):
+        query = select_entries + 'WHERE entries.id IN (' + ids_query + ') ORDER BY entries.id, fields.position'
+        return BibtexParser(list(self._iter_entries(query, parameters)))
+
+    def _iter_entries(self, query, parameters):
+        cursor = self.connection.execute(query, parameters)
+        entry_id, key, entry_type, fields = None, None, None, {}
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            for row_id, row_key, row_type, field, content in rows:
+                if row_id != entry_id:
+                    if entry_id is not None:
+                        yield BibtexEntry.from_fields(key, entry_type, fields)
+                    entry_id, key, entry_type, fields = row_id, row_key, row_type, {}
+                if field is not None:
+                    fields[field] = content
+        if entry_id is not None:
+            yield BibtexEntry.from_fields(key, entry_type, fields)
@@ -0,0 +1,211 @@
+import re
+from BibtexEntry import BibtexEntry
+
+
+def _balanced_braces(depth: int):
+    # text with braces balanced up to depth levels, written as an unrolled loop: every character can only
+    # be matched one way, so a failing match backtracks in linear time without possessive quantifiers
+    inner = r'[^{}]*'
+    for _ in range(depth):
+        inner = r'[^{}]*(?:\{' + inner + r'\}[^{}]*)*'
+    return inner
+
+
+regex_word = re.compile(r'\w+')
+
+
+def is_field_name(name: bytes):
+    return name.isascii() or regex_word.fullmatch(name.decode('utf8', 'replace')) is not None
+
+
+class BibtexTokenizer:
+    # values nested deeper than max_depth fall back to scanning brace by brace
+    max_depth = 4
+
+    def __init__(self, binary=False):
+        # a binary tokenizer works on bytes-like buffers such as mmap objects and only decodes
+        # the type, key, field names and contents of the entries it yields
+        self.binary = binary
+        compile = (lambda pattern: re.compile(pattern.encode('ascii'))) if binary else re.compile
+        self.empty, self.at, self.opening_brace, self.quote = (b'', b'@', b'{', b'"') if binary else ('', '@', '{', '"')
+        inner = _balanced_braces(self.max_depth)
+        # \w only matches ASCII in bytes, so field names may hold any non-ASCII bytes, and is_field_name keeps
+        # those that are words once decoded, like the \w of str
+        name = r'(?:\w|[\x80-\xff])+' if binary else r'\w+'
+        # the type ends at a line break, but whitespace including line breaks may come before the brace
+        self.regex_entry_start = compile(r'@[^@{\n]*\s*(\{)?')
+        self.regex_entry = compile(r'\{' + _balanced_braces(self.max_depth + 1) + r'\}')
+        self.regex_type_key = compile(r'@(?P<type>(.*?))\s*\{\s*(?P<key>(.*?))\s*,')
+        self.regex_field = compile(
+            r'[\s,]*(?P<field>' + name + r')\s*=\s*'
+            r'(?:\{(?P<braced>' + inner + r')\}'
+            r'|"(?P<quoted>[^"{}]*(?:\{' + inner + r'\}[^"{}]*)*)"'
+            r'|(?P<bare>[^\s,{}"#]+)(?=\s*(?:,|$)))')
+        self.regex_field_name = compile(r'[\s,]*(?P<field>' + name + r')\s*=\s*')
+        self.regex_separator = compile(r'[\s,]*')
+        self.regex_braces = compile(r'(\{)|(\})')
+        self.regex_quoted = compile(r'(\{)|(\})|(")')
+        self.regex_value_end = compile(r'(\{)|(\})|(,)')
+
+    def parse(self, buffer: str):
+        for span in self.iter_spans(buffer):
+            yield self.make_entry(buffer, span)
+
+    def iterparse(self, stream, chunk_size=1 << 16):
+        buffer = self.empty
+        while True:
+            chunk = stream.read(chunk_size)
+            final = not chunk
+            buffer += chunk
+            spans = self.iter_spans(buffer, final=final)
+            while True:
+                try:
+                    span = next(spans)
+                except StopIteration as stop:
+                    pos = stop.value
+                    break
+                yield self.make_entry(buffer, span)
+            if final:
+                return
+            buffer = buffer[pos:]
+
+    def parse_range(self, buffer, start=0, limit=None):
+        # returns the entries starting in [start, limit), their offsets and the offset to continue from
+        entries, starts = [], []
+        spans = self.iter_spans(buffer, start, limit=limit)
+        while True:
+            try:
+                span = next(spans)
+            except StopIteration as stop:
+                return entries, starts, stop.value
+            starts.append(span[2])
+            entries.append(self.make_entry(buffer, span))
+
+    def make_entry(self, buffer, span):
+        entry_type, key, _, body, end = span
+        return BibtexEntry.from_fields(key, entry_type, dict(self.iter_fields(buffer, body, end - 1)))
+
+    def iter_spans(self, buffer, start=0, end=None, final=True, limit=None):
+        # yields (type, key, start, body, end) for every entry, body being the offset after 'key,'
+        # and end the offset after the closing brace. Unless final, an entry cut off by the end of
+        # the buffer stops the iteration and its start is returned so it can be resumed.
+        # Only entries starting before limit are yielded, but they may extend up to end. The return
+        # value is the offset a scan of the rest of the buffer has to continue from.
+        if end is None:
+            end = len(buffer)
+        if limit is None:
+            limit = end
+        pos = start
+        while True:
+            at = buffer.find(self.at, pos, limit)
+            if at < 0:
+                return max(pos, limit)
+            opening = self.regex_entry_start.match(buffer, at, end)
+            if opening.lastindex is None:
+                if not final and opening.end() == end:
+                    return at
+                pos = at + 1
+                continue
+            close = self.find_closing_brace(buffer, opening.end() - 1, end)
+            if close < 0:
+                return at if not final else end
+            head = self.regex_type_key.match(buffer, at, close)
+            if head is not None:
+                entry_type, key = head.group('type', 'key')
+                if self.binary:
+                    entry_type, key = entry_type.decode('utf8'), key.decode('utf8')
+                yield entry_type, key, at, head.end(), close + 1
+            pos = close + 1
+
+    def iter_fields(self, buffer, body, close):
+        # yields (field, content) for every field between body and the closing brace of the entry
+        pos = body
+        while True:
+            field = self.regex_field.match(buffer, pos, close)
+            if field is not None and self.binary and not is_field_name(field.group('field')):
+                field = None
+            if field is not None:
+                name, braced, quoted, bare = field.group('field', 'braced', 'quoted', 'bare')
+                content = braced if braced is not None else quoted if quoted is not None else bare
+                pos = field.end()
+                if self.binary:
+                    if b'\r' in content:
+                        content = content.replace(b'\r', b'')
+                    yield name.decode('utf8'), content.replace(b'\n', b'').decode('utf8')
+                else:
+                    yield name, content.replace('\n', '')
+                continue
+            pos = self.regex_separator.match(buffer, pos, close).end()
+            if pos >= close:
+                return
+            field = self.regex_field_name.match(buffer, pos, close)
+            if field is not None and self.binary and not is_field_name(field.group('field')):
+                field = None
+            if field is None:
+                pos = self.find_value_end(buffer, pos, close)
+                continue
+            pos = field.end()
+            char = buffer[pos:pos + 1]
+            if char == self.opening_brace:
+                stop = self.find_closing_brace(buffer, pos, close)
+                if stop < 0:
+                    return
+                content = buffer[pos + 1:stop]
+                pos = stop + 1
+            elif char == self.quote:
+                stop = self.find_closing_quote(buffer, pos + 1, close)
+                if stop < 0:
+                    return
+                content = buffer[pos + 1:stop]
+                pos = stop + 1
+            else:
+                stop = self.find_value_end(buffer, pos, close)
+                content = buffer[pos:stop].strip()
+                pos = stop
+            if self.binary:
+                yield field.group('field').decode('utf8'), self.decode(content)
+            else:
+                yield field.group('field'), content.replace('\n', '')
+
+    @staticmethod
+    def decode(content: bytes):
+        # same result as reading the file in text mode, where \r\n and \r become \n, and removing \n
+        if b'\r' in content:
+            content = content.replace(b'\r', b'')
+        return content.replace(b'\n', b'').decode('utf8')
+
+    def find_closing_brace(self, buffer, opening, end):
+        match = self.regex_entry.match(buffer, opening, end)
+        if match is not None:
+            return match.end() - 1
+        depth = 0
+        for match in self.regex_braces.finditer(buffer, opening, end):
+            if match.lastindex == 1:
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return match.start()
+        return -1
+
+    def find_closing_quote(self, buffer, start, end):
+        depth = 0
+        for match in self.regex_quoted.finditer(buffer, start, end):
+            if match.lastindex == 1:
+                depth += 1
+            elif match.lastindex == 2:
+                depth -= 1
+            elif depth == 0:
+                return match.start()
+        return -1
+
+    def find_value_end(self, buffer, start, end):
+        depth = 0
+        for match in self.regex_value_end.finditer(buffer, start, end):
+            if match.lastindex == 1:
+                depth += 1
+            elif match.lastindex == 2:
+                depth -= 1
+            elif depth == 0:
+                return match.start()
+        return end
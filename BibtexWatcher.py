@@ -0,0 +1,100 @@
+import os
+import time
+from BibtexParser import BibtexParser
+from BibtexCitations import CitationScanner, find_files
+
+
+class BibtexWatcher:
+    # Keeps output_filename holding the entries of bib_files that are cited in the .tex files of folders.
+    # The files are polled every interval seconds and changes are only handled once no file changed for
+    # debounce seconds. Each .bib file is reloaded incrementally (see BibtexParser.reload) and only edited
+    # .tex files are scanned again (see CitationScanner). The output is only written when the cited
+    # entries changed.
+    def __init__(self, bib_files, folders, output_filename, include_subfolders=False, file_extensions=None,
+                 interval=1.0, debounce=0.5, pretty_print=True, workers=None):
+        self.bib_files = list(bib_files)
+        self.folders = list(folders)
+        self.output_filename = output_filename
+        self.include_subfolders = include_subfolders
+        self.file_extensions = file_extensions
+        self.interval = interval
+        self.debounce = debounce
+        self.pretty_print = pretty_print
+        self.scanner = CitationScanner(workers)
+        self.bibliographies = [BibtexParser() for _ in self.bib_files]
+        self.bibliography = BibtexParser()
+        self.cited = None
+        self.updates = 0
+        self.writes = 0
+        self._bib_signatures = [None] * len(self.bib_files)
+        self._signature = None
+        self._pending = None
+        self._changed_at = 0.0
+        self._running = False
+
+    def poll(self):
+        # checks the files once, returns True if the output was written
+        signature = self._get_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._pending = signature
+            self._changed_at = time.monotonic()
+        if self._pending is None or time.monotonic() - self._changed_at < self.debounce:
+            return False
+        self._pending = None
+        return self.update()
+
+    def update(self):
+        # reloads changed .bib files, rescans the sources and writes the output if the cited entries changed
+        self.updates += 1
+        reloaded = False
+        for idx, filename in enumerate(self.bib_files):
+            signature = self._stat(filename)
+            if signature == self._bib_signatures[idx]: continue
+            if signature is None:
+                self.bibliographies[idx] = BibtexParser()
+            else:
+                self.bibliographies[idx].reload(filename)
+            self._bib_signatures[idx] = signature
+            reloaded = True
+        if reloaded:
+            entries = []
+            for bibliography in self.bibliographies:
+                entries += bibliography.entries
+            self.bibliography = BibtexParser(entries)
+        files = find_files(self.folders, self.include_subfolders, self.file_extensions)
+        cited = self.bibliography.get_entries_cited_in_files(files, self.scanner).entries
+        if self.cited is not None and os.path.isfile(self.output_filename) and len(cited) == len(self.cited) \
+                and all(new is old for new, old in zip(cited, self.cited)):
+            return False
+        BibtexParser(cited).write(self.output_filename, self.pretty_print, atomic=True)
+        self.cited = cited
+        self.writes += 1
+        return True
+
+    def run(self, timeout=None):
+        # polls until stop() is called or, if given, timeout seconds have passed
+        self._running = True
+        stop_at = None if timeout is None else time.monotonic() + timeout
+        if self.cited is None:
+            self._signature = self._get_signature()
+            self.update()
+        while self._running and (stop_at is None or time.monotonic() < stop_at):
+            self.poll()
+            time.sleep(self.interval)
+        self._running = False
+
+    def stop(self):
+        self._running = False
+
+    def _get_signature(self):
+        files = find_files(self.folders, self.include_subfolders, self.file_extensions)
+        return tuple((filename, self._stat(filename)) for filename in self.bib_files + files)
+
+    @staticmethod
+    def _stat(filename: str):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
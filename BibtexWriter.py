@@ -0,0 +1,76 @@
+import io
+import os
+import shutil
+import tempfile
+
+
+def serialize_entry(entry, pretty_print=True):
+    source = entry.verbatim()
+    if source is not None:
+        return source + '\n\n'
+    items = tuple(entry.field_items())
+    if pretty_print and items:
+        width = max([len(field) for field, _ in items])
+        lines = ['    ' + field.ljust(width) + ' = {' + content + '}' for field, content in items]
+    else:
+        lines = ['    ' + field + ' = {' + content + '}' for field, content in items]
+    if not lines:
+        return '@' + entry.type + '{' + entry.key + ',\n}\n\n'
+    return '@' + entry.type + '{' + entry.key + ',\n' + ',\n'.join(lines) + '\n}\n\n'
+
+
+def iter_serialize(entries, pretty_print=True):
+    for entry in entries:
+        yield serialize_entry(entry, pretty_print)
+
+
+def is_binary_stream(stream):
+    return isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(stream, 'mode', '')
+
+
+def dump(entries, stream, pretty_print=True, buffer_size=1 << 16):
+    # entries may be any iterable, e.g. BibtexParser.iterparse, and are written in chunks of about
+    # buffer_size characters to a text stream or, encoded as UTF-8, to a binary stream
+    binary = is_binary_stream(stream)
+    chunk, chunk_size = [], 0
+    for text in iter_serialize(entries, pretty_print):
+        chunk.append(text)
+        chunk_size += len(text)
+        if chunk_size >= buffer_size:
+            stream.write(''.join(chunk).encode('utf8') if binary else ''.join(chunk))
+            chunk, chunk_size = [], 0
+    if chunk:
+        stream.write(''.join(chunk).encode('utf8') if binary else ''.join(chunk))
+
+
+def write_file(entries, filename: str, pretty_print=True, append=False, atomic=False):
+    # With atomic, the output goes to a temporary file next to filename, which then replaces it, so an
+    # interrupted write never leaves a truncated file behind.
+    if not atomic:
+        with open(filename, 'a' if append else 'w', encoding='utf8') as file:
+            dump(entries, file, pretty_print)
+        return
+    filename = os.path.realpath(filename)
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.' + os.path.basename(filename), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf8') as file:
+            if not os.path.isfile(filename):
+                # mkstemp creates the file readable by the owner only
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_filename, 0o666 & ~umask)
+            else:
+                shutil.copymode(filename, tmp_filename)
+                if append:
+                    with open(filename, 'r', encoding='utf8') as existing:
+                        shutil.copyfileobj(existing, file)
+            dump(entries, file, pretty_print)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
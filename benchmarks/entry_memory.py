@@ -0,0 +1,77 @@
+import os
+import re
+import sys
+import tracemalloc
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BibtexEntry import BibtexEntry
+
+
+class LegacyEntry:
+    # layout of BibtexEntry before it used __slots__: instance dict, OrderedDict and compiled regexes
+    def __init__(self, key: str, entryType='article'):
+        self.key = key
+        self.type = entryType
+        self.fields = OrderedDict()
+        self.get_url_from_latex_url = re.compile(r'\\url\{\s*(.*)\s*\}')
+        self.get_url_from_href = re.compile(r'\\href\{(.*)\}\{.*\}')
+        self.get_title_from_href = re.compile(r'\\href\{.*\}\{(.*)\}')
+
+
+def make_fields(i):
+    # new strings for every entry, as the parser would produce them
+    return {
+        'author': 'Doe, Jane and Roe, Richard %d' % (i % 100),
+        'title': 'On the analysis of entry number %d' % i,
+        'journal': 'Journal of Examples %d' % (i % 20),
+        'year': str(1990 + i % 30),
+        'url': 'https://example.org/%d' % i,
+    }
+
+
+# field names are copied so that every entry gets its own name strings, as parsed entries would
+
+def build_legacy(i, fields):
+    entry = LegacyEntry('key%d' % i)
+    for field, content in fields.items():
+        entry.fields[''.join(field)] = content
+    return entry
+
+
+def build_materialized(i, fields):
+    entry = BibtexEntry('key%d' % i)
+    for field, content in fields.items():
+        entry.set_field(''.join(field), content)
+    return entry
+
+
+def build_compact(i, fields):
+    return BibtexEntry.from_fields('key%d' % i, 'article', {''.join(field): content for field, content in fields.items()})
+
+
+def bytes_per_entry(build, count):
+    # the field contents are the same in every layout, so they are allocated before measuring
+    contents = [make_fields(i) for i in range(count)]
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    entries = [build(i, contents[i]) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del entries, contents
+    return used / count
+
+
+def main(count=20000):
+    results = [
+        ('legacy (dict + OrderedDict)', bytes_per_entry(build_legacy, count)),
+        ('slotted, OrderedDict', bytes_per_entry(build_materialized, count)),
+        ('slotted, compact tuples', bytes_per_entry(build_compact, count)),
+    ]
+    legacy = results[0][1]
+    for name, size in results:
+        print('%-30s %8.0f bytes/entry  %5.1f%%' % (name, size, 100 * size / legacy))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
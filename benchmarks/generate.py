@@ -0,0 +1,104 @@
+import argparse
+import os
+import random
+
+words = ['analysis', 'learning', 'networks', 'graph', 'quantum', 'estimation', 'robust', 'sparse', 'model',
+         'inference', 'control', 'optimal', 'random', 'dynamics', 'theory', 'systems', 'data', 'methods']
+unicode_words = ['Müller', 'Ångström', 'naïve', 'façade', 'Øresund', 'Łódź', 'señal', 'Erdős', 'Gödel', 'Straße']
+latex_words = ['M{\\"u}ller', '{\\AA}ngstr{\\"o}m', 'na{\\"\\i}ve', 'fa{\\c{c}}ade', '{B}ayesian', '$\\alpha$-stable']
+last_names = ['Smith', 'Doe', 'Roe', 'Chen', 'Garcia', 'Nguyen', 'Kowalski', 'Okafor', 'Tanaka', 'Rossi']
+types = ['article', 'inproceedings', 'book', 'misc', 'techreport']
+
+# share of entries having each optional field
+default_field_mix = {'abstract': 0.3, 'doi': 0.5, 'url': 0.6, 'pages': 0.7, 'note': 0.1, 'keywords': 0.2}
+
+
+def make_title(rng, depth, unicode_share):
+    title = []
+    for _ in range(rng.randint(4, 12)):
+        draw = rng.random()
+        if draw < unicode_share:
+            title.append(rng.choice(unicode_words))
+        elif draw < 2 * unicode_share:
+            title.append(rng.choice(latex_words))
+        else:
+            title.append(rng.choice(words))
+    for _ in range(rng.randint(0, depth)):
+        # protect a word in nested braces, as in {{GPU}s}
+        idx = rng.randrange(len(title))
+        title[idx] = '{' + title[idx] + '}'
+    return ' '.join(title)
+
+
+def make_entry(rng, idx, field_mix, depth, unicode_share):
+    entry_type = rng.choice(types)
+    authors = ' and '.join(rng.choice(last_names) + ', ' + chr(65 + rng.randrange(26)) + '.' for _ in range(rng.randint(1, 5)))
+    fields = [('author', authors), ('title', make_title(rng, depth, unicode_share))]
+    if entry_type == 'article':
+        fields.append(('journal', 'Journal of ' + rng.choice(words).capitalize() + ' ' + str(rng.randrange(40))))
+    elif entry_type == 'inproceedings':
+        fields.append(('booktitle', 'Proceedings of ' + rng.choice(words).capitalize()))
+    fields.append(('year', str(rng.randint(1950, 2024))))
+    for field, share in field_mix.items():
+        if rng.random() >= share: continue
+        if field == 'abstract':
+            content = '\n  '.join(make_title(rng, depth, unicode_share) for _ in range(rng.randint(1, 4)))
+        elif field == 'doi':
+            content = '10.%d/%x' % (rng.randrange(1000, 9999), rng.getrandbits(32))
+        elif field == 'url':
+            content = '\\url{https://example.org/%d}' % idx
+        elif field == 'pages':
+            first = rng.randrange(1, 900)
+            content = '%d--%d' % (first, first + rng.randrange(1, 30))
+        else:
+            content = make_title(rng, depth, unicode_share)
+        fields.append((field, content))
+    lines = ['    ' + field + ' = {' + content + '}' for field, content in fields]
+    return '@' + entry_type + '{key' + str(idx) + ',\n' + ',\n'.join(lines) + '\n}\n\n'
+
+
+def generate(filename: str, count: int, seed=0, field_mix=None, depth=2, unicode_share=0.05, duplicate_share=0.01):
+    # Writes count entries to filename; the same arguments always give the same file. duplicate_share of
+    # the keys are used twice, for check_for_duplicates.
+    if field_mix is None:
+        field_mix = default_field_mix
+    rng = random.Random(seed)
+    with open(filename, 'w', encoding='utf8') as file:
+        for idx in range(count):
+            key_idx = rng.randrange(idx) if idx and rng.random() < duplicate_share else idx
+            file.write(make_entry(rng, key_idx, field_mix, depth, unicode_share))
+    return filename
+
+
+def generate_tex_tree(folder: str, keys, files=50, citations_per_file=40, seed=0):
+    # LaTeX sources citing random keys, spread over two levels of folders
+    rng = random.Random(seed)
+    for idx in range(files):
+        subfolder = os.path.join(folder, 'chapter%d' % (idx % 5))
+        os.makedirs(subfolder, exist_ok=True)
+        with open(os.path.join(subfolder, 'section%d.tex' % idx), 'w', encoding='utf8') as file:
+            for _ in range(citations_per_file):
+                cited = ','.join(rng.choice(keys) for _ in range(rng.randint(1, 3)))
+                file.write('Some text about ' + rng.choice(words) + ' \\cite{' + cited + '}.\n')
+                if rng.random() < 0.1:
+                    file.write('% \\cite{commented}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Writes a synthetic .bib file')
+    parser.add_argument('filename')
+    parser.add_argument('count', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=2, help='maximal nesting of braces in titles')
+    parser.add_argument('--unicode-share', type=float, default=0.05)
+    parser.add_argument('--duplicate-share', type=float, default=0.01)
+    parser.add_argument('--field-mix', help='shares of the optional fields, e.g. abstract=0.3,doi=0.5')
+    args = parser.parse_args()
+    field_mix = None
+    if args.field_mix:
+        field_mix = {field: float(share) for field, share in (item.split('=') for item in args.field_mix.split(','))}
+    generate(args.filename, args.count, args.seed, field_mix, args.depth, args.unicode_share, args.duplicate_share)
+
+
+if __name__ == '__main__':
+    main()
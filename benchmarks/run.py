@@ -0,0 +1,169 @@
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BibtexParser import BibtexParser
+from BibtexCitations import CitationScanner
+from generate import generate, generate_tex_tree
+
+default_sizes = [1000, 10000, 100000]
+
+
+def parse(context, engine):
+    bibtex = BibtexParser()
+    bibtex.parse(context['filename'], engine=engine)
+    return len(bibtex)
+
+
+def write(context):
+    context['bibtex'].write(context['output'])
+    return len(context['bibtex'])
+
+
+def key_lookup(context):
+    bibtex, keys = context['bibtex'], context['keys']
+    for key in keys:
+        bibtex.get_entry(key)
+    return len(keys)
+
+
+def queries(context):
+    bibtex = context['bibtex']
+    # a new index is built every time, as after every change of the entries
+    bibtex.invalidate_indexes()
+    bibtex.get_entries_in_year(2000)
+    bibtex.get_entries_with_type('book')
+    bibtex.get_entries_with_author('Chen')
+    bibtex.get_entries_where_content_is_in_field('graph', 'title')
+    return len(bibtex)
+
+
+def duplicates(context):
+    context['bibtex'].check_for_duplicates()
+    return len(context['bibtex'])
+
+
+def cited(context):
+    # a new scanner, so that every run reads all sources instead of using the cached citations
+    context['bibtex'].get_entries_cited_in_folders([context['tex_folder']], include_subfolders=True, scanner=CitationScanner())
+    return len(context['bibtex'])
+
+
+benchmarks = [
+    ('parse', lambda context: parse(context, 'tokenizer')),
+    ('parse_mmap', lambda context: parse(context, 'mmap')),
+    ('write', write),
+    ('key_lookup', key_lookup),
+    ('queries', queries),
+    ('check_for_duplicates', duplicates),
+    ('cited_in_folders', cited),
+]
+
+
+def measure(function, context, repeat, memory):
+    # best time of repeat runs and, with memory, the peak of traced allocations in one more run
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items = function(context)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        function(context)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': best, 'items_per_second': items / best if best else None, 'peak_bytes': peak}
+
+
+def run(sizes, repeat=3, memory=True, selected=None, seed=0):
+    results = {}
+    folder = tempfile.mkdtemp(prefix='bibtex_benchmarks')
+    try:
+        for size in sizes:
+            filename = generate(os.path.join(folder, 'bench%d.bib' % size), size, seed)
+            bibtex = BibtexParser()
+            bibtex.parse(filename)
+            keys = bibtex.get_all_keys()
+            tex_folder = os.path.join(folder, 'tex%d' % size)
+            generate_tex_tree(tex_folder, keys, seed=seed)
+            context = {
+                'filename': filename,
+                'output': os.path.join(folder, 'out%d.bib' % size),
+                'bibtex': bibtex,
+                'keys': keys[::max(1, len(keys) // 10000)],
+                'tex_folder': tex_folder,
+            }
+            megabytes = os.path.getsize(filename) / 1e6
+            for name, function in benchmarks:
+                if selected and name not in selected: continue
+                result = measure(function, context, repeat, memory)
+                result['megabytes'] = megabytes
+                results['%s/%d' % (name, size)] = result
+                print(format_result('%s/%d' % (name, size), result), flush=True)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def format_result(name, result):
+    line = '%-28s %9.4f s %12.0f items/s' % (name, result['seconds'], result['items_per_second'] or 0)
+    if result['peak_bytes'] is not None:
+        line += ' %9.1f MB peak' % (result['peak_bytes'] / 1e6)
+    return line
+
+
+def compare(results, baseline, threshold):
+    # returns the benchmarks that got slower, or used more memory, by more than threshold (0.2 = 20 %)
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None: continue
+        for metric in ('seconds', 'peak_bytes'):
+            if result.get(metric) is None or not old.get(metric): continue
+            change = result[metric] / old[metric] - 1
+            if change > threshold:
+                regressions.append((name, metric, old[metric], result[metric], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks parse, write, lookups and queries on synthetic files')
+    parser.add_argument('--sizes', default=','.join(map(str, default_sizes)),
+                        help='comma separated entry counts, e.g. 1000,10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced run measuring peak memory')
+    parser.add_argument('--only', help='comma separated benchmark names')
+    parser.add_argument('--save', help='write the results as JSON, e.g. as new baseline')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before failing, 0.2 = 20 %%')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    selected = set(args.only.split(',')) if args.only else None
+    results = run(sizes, args.repeat, not args.no_memory, selected)
+    if args.save:
+        with open(args.save, 'w', encoding='utf8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, new, change in regressions:
+            print('REGRESSION %s %s: %.4g -> %.4g (+%.0f%%)' % (name, metric, old, new, 100 * change))
+        if regressions:
+            sys.exit(1)
+        print('no regressions above %.0f%%' % (100 * args.threshold))
+
+
+if __name__ == '__main__':
+    main()
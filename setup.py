@@ -9,4 +9,5 @@ setup(name='BibTeXParser',
       author_email='',
       url='https://github.com/qi55wyqu/BibTeXParser',
       packages=find_packages(),
+      python_requires='>=3.7',
      )
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+import random
+import shutil
+import tempfile
+
+# entries the tokenizer has to get right: nested braces, quoted and bare values, a comment, Windows line
+# endings, text between entries, a brace on the line after the type and a field whose content spans several lines
+sample = (
+    '% a comment with an @ sign\n'
+    '@article{Doe2000,\n'
+    '    author = {Doe, J. and Roe, R.},\n'
+    '    title = {On {Nested {Braces}} in {BibTeX}},\n'
+    '    journal = "Journal of {Tests}",\n'
+    '    year = 2000\n'
+    '}\n\n'
+    'some text between the entries\n'
+    '@book{M\u00fcller1999,\r\n'
+    '    author = {M{\\"u}ller, K.},\r\n'
+    '    title = {Stra\u00dfe},\r\n'
+    '    year = {1999}\r\n'
+    '}\r\n'
+    '@comment{ignored}\n'
+    '@misc{empty,\n}\n'
+    '@misc\n{brace_on_next_line, title = {x}}\n'
+    '@inproceedings{long,\n'
+    '    title = {A title\n    over two lines},\n'
+    '    abstract = {{{{{{deeply} nested} braces} beyond} max} depth},\n'
+    '    note = {%, &, \\url{https://example.org/?a=1&b=2}}\n'
+    '}\n'
+)
+
+words = ['graph', 'quantum', 'robust', 'sparse', 'M{\\"u}ller', '{GPU}s', 'na\u00efve', '{{deep} {er}}']
+
+
+def make_bib(count: int, seed=0):
+    # count random entries, with some duplicate keys and noise between the entries
+    rng = random.Random(seed)
+    parts = []
+    for idx in range(count):
+        key = 'key%d' % (rng.randrange(idx) if idx and rng.random() < 0.05 else idx)
+        fields = ['    author = {%s, A.}' % rng.choice(['Doe', 'Roe', 'Chen'])]
+        fields.append('    title = {%s}' % ' '.join(rng.choice(words) for _ in range(rng.randint(1, 6))))
+        if rng.random() < 0.5:
+            fields.append('    journal = "%s"' % rng.choice(words))
+        fields.append('    year = %d' % rng.randint(1990, 2020))
+        parts.append('@%s{%s,\n%s\n}\n' % (rng.choice(['article', 'book', 'misc']), key, ',\n'.join(fields)))
+        if rng.random() < 0.1:
+            parts.append('noise @ between {entries}\n')
+    return ''.join(parts)
+
+
+def as_tuples(entries):
+    return [(entry.key, entry.type, tuple(entry.field_items())) for entry in entries]
+
+
+class TemporaryFolder:
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix='bibtex_tests')
+
+    def write(self, name: str, text: str):
+        filename = os.path.join(self.path, name)
+        with open(filename, 'w', encoding='utf8', newline='') as file:
+            file.write(text)
+        return filename
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
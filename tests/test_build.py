@@ -0,0 +1,109 @@
+import os
+import unittest
+from BibtexBuild import BibtexBuilder
+from BibtexParser import BibtexParser
+from BibtexWriter import iter_serialize
+from tests.helpers import TemporaryFolder
+
+stubs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+
+
+@unittest.skipIf(os.name == 'nt', 'the stub executables are Python scripts with a shebang line')
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.bibtex = BibtexParser()
+        self.bibtex.parse(self.folder.write('references.bib', ''.join(
+            '@article{key%d,\n    title = {Title %d},\n    year = {%d}\n}\n' % (idx, idx, 2000 + idx % 3) for idx in range(9))))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def builder(self, **kwargs):
+        return BibtexBuilder(os.path.join(self.folder.path, 'cache'), os.path.join(stubs, 'pdflatex'),
+                             os.path.join(stubs, 'biber'), **kwargs)
+
+    def output(self, name: str):
+        return os.path.join(self.folder.path, 'output', name)
+
+    def read(self, filename: str):
+        with open(filename, encoding='utf8') as file:
+            return file.read()
+
+    def test_passes(self):
+        # the .aux changes once biber wrote the .bbl, so pdflatex runs once more to check it is stable
+        builder = self.builder()
+        self.assertTrue(builder.build(self.bibtex.entries, self.output('all.pdf')))
+        self.assertEqual(builder.runs, ['pdflatex', 'biber', 'pdflatex', 'pdflatex'])
+        self.assertIn('@article{key8,', self.read(self.output('all.pdf')))
+
+    def test_skipped_pass(self):
+        # an empty bibliography leaves the .aux unchanged, so the third pdflatex run is skipped
+        builder = self.builder()
+        self.assertTrue(builder.build([], self.output('empty.pdf')))
+        self.assertEqual(builder.runs, ['pdflatex', 'biber', 'pdflatex'])
+
+    def test_max_latex_runs(self):
+        builder = self.builder(max_latex_runs=2)
+        self.assertTrue(builder.build(self.bibtex.entries, self.output('all.pdf')))
+        self.assertEqual(builder.runs, ['pdflatex', 'biber', 'pdflatex'])
+
+    def test_cache_hit(self):
+        builder = self.builder()
+        builder.build(self.bibtex.entries, self.output('first.pdf'))
+        builder.runs.clear()
+        self.assertTrue(builder.build(self.bibtex.entries, self.output('second.pdf')))
+        self.assertEqual(builder.runs, [])
+        self.assertEqual(self.read(self.output('second.pdf')), self.read(self.output('first.pdf')))
+        # a new builder with the same cache directory finds the PDF as well
+        builder = self.builder()
+        self.assertTrue(builder.build(self.bibtex.entries, self.output('third.pdf')))
+        self.assertEqual(builder.runs, [])
+
+    def test_failure(self):
+        builder = self.builder()
+        self.assertTrue(builder.build(self.bibtex.entries, self.output('out.pdf')))
+        builder.runs.clear()
+        builder.clear()
+        self.bibtex.entries[0].set_field('title', 'FAIL')
+        self.assertFalse(builder.build(self.bibtex.entries, self.output('out.pdf')))
+        self.assertEqual(builder.runs, ['pdflatex'])
+        # the PDF of the previous build is removed as well
+        self.assertFalse(os.path.exists(self.output('out.pdf')))
+        self.assertEqual(os.listdir(builder.cache_dir), [])
+
+    def test_eviction(self):
+        # entries of the same size give PDFs of the same size, the cache holds two of them
+        builder = self.builder()
+        entries = self.bibtex.entries
+        builder.build(entries[:1], self.output('a.pdf'))
+        size = os.path.getsize(self.output('a.pdf'))
+        builder.max_size = 2 * size
+        builder.build(entries[1:2], self.output('b.pdf'))
+        a = os.path.join(builder.cache_dir, builder.get_hash(''.join(iter_serialize(entries[:1]))) + '.pdf')
+        b = os.path.join(builder.cache_dir, builder.get_hash(''.join(iter_serialize(entries[1:2]))) + '.pdf')
+        self.assertEqual(sorted(os.listdir(builder.cache_dir)), sorted([os.path.basename(a), os.path.basename(b)]))
+        os.utime(a, (1000, 1000))
+        os.utime(b, (2000, 2000))
+        # using the older PDF makes it the most recently used one, so the other one is evicted
+        builder.build(entries[:1], self.output('a.pdf'))
+        builder.build(entries[2:3], self.output('c.pdf'))
+        remaining = set(os.path.join(builder.cache_dir, name) for name in os.listdir(builder.cache_dir))
+        self.assertEqual(len(remaining), 2)
+        self.assertIn(a, remaining)
+        self.assertNotIn(b, remaining)
+        self.assertLessEqual(sum(os.path.getsize(path) for path in remaining), builder.max_size)
+
+    def test_build_many(self):
+        builder = self.builder()
+        results = builder.build_grouped(self.bibtex.entries, 'year', self.output('{}.pdf'), workers=2)
+        self.assertEqual(results, {self.output('%d.pdf' % year): True for year in (2000, 2001, 2002)})
+        for idx in range(9):
+            self.assertIn('@article{key%d,' % idx, self.read(self.output('%d.pdf' % (2000 + idx % 3))))
+        # the commands run in the worker processes are counted in the builder
+        self.assertEqual(builder.runs.count('pdflatex'), 9)
+        self.assertEqual(builder.runs.count('biber'), 3)
+        builder.runs.clear()
+        self.assertEqual(set(builder.build_many({self.output('again.pdf'): self.bibtex.entries[:3],
+                                                 self.output('all.pdf'): self.bibtex.entries}, workers=2).values()), {True})
+        self.assertEqual(builder.runs.count('pdflatex'), 6)
@@ -0,0 +1,102 @@
+import os
+import random
+import struct
+import unittest
+from BibtexCache import BibtexCache
+from BibtexParser import BibtexParser
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.cache = BibtexCache(os.path.join(self.folder.path, 'cache'))
+        self.filename = self.folder.write('references.bib', sample + make_bib(50))
+        self.expected = self.parse()
+        self.cache_filename = self.cache.get_cache_filename(self.filename)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def parse(self, filename=None):
+        bibtex = BibtexParser()
+        bibtex.parse(filename or self.filename, cache=self.cache)
+        return as_tuples(bibtex.entries)
+
+    def read_cache(self):
+        with open(self.cache_filename, 'rb') as file:
+            return file.read()
+
+    def write_cache(self, data: bytes):
+        with open(self.cache_filename, 'wb') as file:
+            file.write(data)
+
+    def test_hit(self):
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        self.assertEqual(self.parse(), self.expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_stale_file(self):
+        stat = os.stat(self.filename)
+        # the same size, but other contents
+        with open(self.filename, 'r+b') as file:
+            file.write(b'@misc{changed, title = {x}}\n%')
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        bibtex = BibtexParser()
+        bibtex.parse(self.filename)
+        self.assertEqual(self.parse(), as_tuples(bibtex.entries))
+        self.assertEqual(self.cache.hits, 0)
+        # only touched: the hash of the file still matches
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2000))
+        self.assertEqual(self.parse(), as_tuples(bibtex.entries))
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_corrupt_payload(self):
+        data = self.read_cache()
+        # a content inside the marshalled entries, which still unmarshals
+        position = data.index(b'Nested')
+        self.write_cache(data[:position] + b'M' + data[position + 1:])
+        self.assertEqual(self.parse(), self.expected)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.read_cache(), data)
+
+    def test_random_corruption(self):
+        data = self.read_cache()
+        rng = random.Random(0)
+        for _ in range(300):
+            if rng.random() < 0.5:
+                position = rng.randrange(len(data))
+                corrupt = data[:position] + bytes([data[position] ^ (1 << rng.randrange(8))]) + data[position + 1:]
+            else:
+                corrupt = data[:rng.randrange(len(data))]
+            self.write_cache(corrupt)
+            self.assertEqual(self.parse(), self.expected)
+
+    def test_version_mismatch(self):
+        data = self.read_cache()
+        magic, version = struct.unpack_from('<4sH', data)
+        self.write_cache(struct.pack('<4sH', magic, version + 1) + data[6:])
+        self.assertEqual(self.parse(), self.expected)
+        self.assertEqual(self.cache.hits, 0)
+        # the cache file was written again in the current version
+        self.assertEqual(self.read_cache(), data)
+
+    def test_eviction(self):
+        filenames = [self.folder.write('file%d.bib' % idx, make_bib(50, seed=idx)) for idx in range(4)]
+        for filename in filenames[:2]:
+            self.parse(filename)
+        sizes = [os.path.getsize(self.cache.get_cache_filename(filename)) for filename in [self.filename] + filenames[:2]]
+        # room for the two largest cache files
+        self.cache.max_size = sum(sorted(sizes)[1:])
+        for mtime, filename in enumerate([filenames[0], self.filename, filenames[1]]):
+            os.utime(self.cache.get_cache_filename(filename), (1000 + mtime, 1000 + mtime))
+        self.parse(filenames[2])
+        self.assertLessEqual(sum(entry.stat().st_size for entry in os.scandir(self.cache.directory)), self.cache.max_size)
+        self.assertFalse(os.path.exists(self.cache.get_cache_filename(filenames[0])))
+        self.assertTrue(os.path.exists(self.cache.get_cache_filename(filenames[2])))
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+from BibtexCitations import CitationScanner, scan_file, find_files
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from tests.helpers import TemporaryFolder
+
+document = (
+    'Two on one line \\cite{a} and \\citep{b, c} and again \\cite{a}.\n'
+    'With options \\cite[p.~3]{d}, \\citep[see][12]{e} and \\citet [x] {f}.\n'
+    'Starred \\citeauthor*{g}, \\nocite{h} and \\nocite{*}.\n'
+    '% \\cite{commented} is skipped\n'
+    'after text % \\cite{commented_too}\n'
+    'an escaped \\% sign keeps \\cite{i}\n'
+    'split over\n lines \\cite{j,\n  k}\n'
+)
+
+
+class TestCitations(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.filename = self.folder.write('main.tex', document)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_scan_file(self):
+        self.assertEqual(scan_file(self.filename), ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k'))
+
+    def test_invalid_utf8(self):
+        filename = os.path.join(self.folder.path, 'latin1.tex')
+        with open(filename, 'wb') as file:
+            file.write('\\cite{x} \xe9'.encode('latin1'))
+        self.assertEqual(scan_file(filename), ())
+
+    def test_find_files(self):
+        os.makedirs(os.path.join(self.folder.path, 'chapters'))
+        chapter = self.folder.write(os.path.join('chapters', 'one.tex'), '\\cite{z}')
+        other = self.folder.write('notes.txt', '\\cite{y}')
+        self.assertEqual(find_files([self.folder.path]), [self.filename])
+        self.assertEqual(find_files([self.folder.path], include_subfolders=True), [self.filename, chapter])
+        self.assertEqual(sorted(find_files([self.folder.path], file_extensions=['.tex', '.txt'])), sorted([self.filename, other]))
+
+    def test_cache(self):
+        scanner = CitationScanner(workers=1)
+        missing = os.path.join(self.folder.path, 'missing.tex')
+        self.assertEqual(scanner.scan([self.filename, missing])[1], ())
+        self.assertEqual((scanner.files_scanned, scanner.cache_hits), (1, 0))
+        self.assertEqual(scanner.scan([self.filename])[0][0], 'a')
+        self.assertEqual((scanner.files_scanned, scanner.cache_hits), (1, 1))
+        # another size
+        self.folder.write('main.tex', document + '\\cite{l}')
+        self.assertEqual(scanner.scan([self.filename])[0][-1], 'l')
+        self.assertEqual(scanner.files_scanned, 2)
+        # the same size, but another modification time
+        stat = os.stat(self.filename)
+        self.folder.write('main.tex', document + '\\cite{m}')
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertEqual(scanner.scan([self.filename])[0][-1], 'm')
+        self.assertEqual((scanner.files_scanned, scanner.cache_hits), (3, 1))
+        scanner.clear()
+        scanner.scan([self.filename])
+        self.assertEqual(scanner.files_scanned, 4)
+
+    def test_workers(self):
+        files = [self.folder.write('file%d.tex' % idx, '\\cite{k%d} \\cite{common}' % idx) for idx in range(20)]
+        expected = CitationScanner(workers=1).scan(files)
+        self.assertEqual(expected[3], ('k3', 'common'))
+        self.assertEqual(CitationScanner(workers=4).scan(files), expected)
+        self.assertEqual(CitationScanner(workers=2, use_processes=True).scan(files), expected)
+
+    def test_entries_cited_in_files(self):
+        bibtex = BibtexParser([BibtexEntry.from_fields(key, 'misc', {'title': key}) for key in 'kjihgfedcba'])
+        other = self.folder.write('other.tex', '\\cite{c, x, k}')
+        cited = bibtex.get_entries_cited_in_files([self.filename, other])
+        self.assertEqual([entry.key for entry in cited], list('abcdefghijk'))
+        # the order of the files in a folder depends on the file system
+        self.assertEqual(sorted(bibtex.get_keys_cited_in_folder([self.folder.path])), list('abcdefghijk'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import io
+import copy
+import pickle
+import unittest
+from BibtexColumns import BibtexColumns, ColumnEntry
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def make_parser():
+    bibtex = BibtexParser()
+    bibtex.entries = [BibtexEntry.from_fields('k%d' % idx, ['article', 'book'][idx % 2],
+                                              {'title': 'Title %d' % idx, 'year': str(2000 + idx % 3)}) for idx in range(40)]
+    bibtex.entries[3].set_field('journal', 'J')
+    return bibtex
+
+
+class TestColumns(unittest.TestCase):
+    def test_filters(self):
+        bibtex = make_parser()
+        columns = bibtex.to_columns()
+        self.assertTrue(columns.get_column('year').is_dictionary)
+        self.assertFalse(columns.get_column('title').is_dictionary)
+        self.assertEqual(columns.equal('year', '2001'), list(range(1, 40, 3)))
+        self.assertEqual(columns.isin('type', ['book']), list(range(1, 40, 2)))
+        self.assertEqual(columns.where('title', lambda title: title.endswith('9')), [9, 19, 29, 39])
+        self.assertEqual(columns.present('journal'), [3])
+        self.assertEqual(len(columns.missing('journal')), 39)
+        self.assertEqual(columns.equal('nonexistent', 'x'), [])
+        self.assertEqual(columns.project(['year', 'journal'], [2, 3]), [('2002', None), ('2000', 'J')])
+        self.assertEqual(columns.group_by('year')['2000'], list(range(0, 40, 3)))
+        self.assertEqual(columns.count('type'), {'article': 20, 'book': 20})
+        self.assertEqual(as_tuples(columns), as_tuples(bibtex.entries))
+
+    def test_snapshot_is_detached(self):
+        bibtex = make_parser()
+        columns = bibtex.to_columns()
+        columns[0].set_field('year', '1990')
+        self.assertEqual(bibtex.entries[0].year, '2000')
+        self.assertEqual(columns.equal('year', '1990'), [0])
+
+    def test_views_write_through(self):
+        bibtex = make_parser()
+        expected = make_parser()
+        columns = bibtex.use_columns()
+        self.assertTrue(all(type(entry) is ColumnEntry for entry in bibtex))
+        for parser in (bibtex, expected):
+            parser.entries[0].set_field('year', '1990')
+            parser.entries[1].fields['title'] = 'Changed'
+            del parser.entries[2].fields['year']
+            parser.entries[3].type = 'misc'
+            parser.entries[4].fields = {'note': 'only a note'}
+            parser.entries[5].set_field('journal', 'K')
+            parser.set_field_last('title')
+            parser.set_order_of_fields(['journal', 'year'], keys=['k3', 'k5'])
+            parser.remove_fields_from_keys(['year'], keys=['k6'])
+            parser.entries[7].set_field('url', '\\url{https://example.org/?a=1&b=2}')
+            parser.fix_special_characters(only_if_url_or_href=True)
+        self.assertEqual(as_tuples(bibtex.entries), as_tuples(expected.entries))
+        self.assertEqual(as_tuples(columns), as_tuples(expected.entries))
+        self.assertIs(bibtex.columns, columns)
+        self.assertEqual(columns.equal('year', '1990'), [0])
+        self.assertEqual(columns.present('note'), [4])
+        self.assertEqual(columns.count('type')['misc'], 1)
+        self.assertEqual(columns.equal('title', 'Changed'), [1])
+        self.assertEqual(list(bibtex.entries[3].fields), ['journal', 'year', 'title'])
+        self.assertEqual(self.dump(bibtex), self.dump(expected))
+
+    def dump(self, bibtex):
+        stream = io.StringIO()
+        bibtex.dump(stream)
+        return stream.getvalue()
+
+    def test_list_changes(self):
+        bibtex = make_parser()
+        bibtex.use_columns()
+        first = bibtex.entries[0]
+        bibtex.sort_by_key(reverse=True)
+        bibtex.remove_keys(['k5'])
+        added = BibtexEntry.from_fields('new', 'misc', {'year': '2000'})
+        bibtex.append_entry(added)
+        columns = bibtex.columns
+        # rows are positions in entries, entries that were views keep their objects
+        self.assertEqual([entry.key for entry in columns], [entry.key for entry in bibtex.entries])
+        self.assertIs(columns[len(bibtex) - 2], first)
+        self.assertIsInstance(bibtex.entries[-1], ColumnEntry)
+        self.assertEqual(bibtex.get_index_of_key('new'), len(bibtex) - 1)
+        self.assertEqual(columns.select(columns.equal('type', 'misc')), [bibtex.entries[-1]])
+        first.set_field('year', '1990')
+        self.assertEqual(columns.equal('year', '1990'), [len(bibtex) - 2])
+
+    def test_indexes(self):
+        bibtex = make_parser()
+        bibtex.use_columns()
+        self.assertEqual(len(bibtex.get_entries_in_year(2001)), 13)
+        bibtex.entries[1].set_field('year', '1990')
+        self.assertEqual(len(bibtex.get_entries_in_year(2001)), 12)
+        bibtex.entries[1].key = 'renamed'
+        self.assertIs(bibtex.get_entry('renamed'), bibtex.entries[1])
+        self.assertNotIn('k1', bibtex)
+
+    def test_parse_and_reload(self):
+        folder = TemporaryFolder()
+        try:
+            text = sample + make_bib(100)
+            filename = folder.write('references.bib', text)
+            expected = BibtexParser()
+            expected.parse(filename)
+            bibtex = BibtexParser()
+            bibtex.parse(filename, columns=True)
+            self.assertEqual(as_tuples(bibtex.entries), as_tuples(expected.entries))
+            self.assertTrue(all(type(entry) is ColumnEntry for entry in bibtex))
+            kept = bibtex.entries[-1]
+            folder.write('references.bib', '@misc{first, year = {1}}\n' + text)
+            added, changed, removed = bibtex.reload()
+            self.assertEqual([entry.key for entry in added], ['first'])
+            self.assertIs(added[0], bibtex.entries[0])
+            self.assertIsInstance(added[0], ColumnEntry)
+            self.assertIs(bibtex.entries[-1], kept)
+            self.assertEqual(bibtex.columns.equal('year', '1'), [0])
+        finally:
+            folder.cleanup()
+
+    def test_copies_are_detached(self):
+        bibtex = make_parser()
+        bibtex.use_columns()
+        entry = bibtex.entries[0]
+        for other in (copy.copy(entry), copy.deepcopy(entry), pickle.loads(pickle.dumps(entry))):
+            self.assertIs(type(other), BibtexEntry)
+            self.assertEqual(as_tuples([other]), as_tuples([entry]))
+            other.set_field('year', '1990')
+            self.assertEqual(entry.year, '2000')
+
+    def test_buffer_column_edits(self):
+        bibtex = make_parser()
+        columns = bibtex.use_columns()
+        title = columns.get_column('title')
+        bibtex.entries[2].set_field('title', 'New title')
+        del bibtex.entries[3].fields['title']
+        self.assertEqual(columns.where('title', lambda content: content.startswith('New')), [2])
+        self.assertNotIn(3, columns.present('title'))
+        title.compact()
+        self.assertIsNone(title.overrides)
+        self.assertEqual(title.get(2), 'New title')
+        self.assertIsNone(title.get(3))
+        self.assertEqual(title.get(4), 'Title 4')
+
+    @unittest.skipIf(numpy is None, 'needs numpy')
+    def test_to_numpy(self):
+        bibtex = make_parser()
+        columns = bibtex.use_columns()
+        codes, dictionary = columns.to_numpy('year')
+        self.assertEqual([dictionary[code] for code in codes[:3]], ['2000', '2001', '2002'])
+        bibtex.entries[0].set_field('title', 'T')
+        offsets, data = columns.to_numpy('title')
+        self.assertEqual(bytes(data[offsets[0]:offsets[1]]), b'T')
+
+
+if __name__ == '__main__':
+    unittest.main()
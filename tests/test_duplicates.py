@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexDuplicates import DuplicateFinder, normalize
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+script = '''
+from BibtexDuplicates import DuplicateFinder
+from BibtexParser import BibtexParser
+from tests.helpers import make_bib
+bibtex = BibtexParser()
+bibtex.entries = list(bibtex.tokenizer.parse(make_bib(1000, seed=3)))
+print(DuplicateFinder(threshold=0.6).find(bibtex.entries))
+'''
+
+
+def make_entry(key, title, author, year):
+    return BibtexEntry.from_fields(key, 'article', {'author': author, 'title': title, 'year': year})
+
+
+class TestDuplicates(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize('M{\\"u}ller: {GPU}s and Straße'), 'muller gpus and straße')
+        self.assertEqual(normalize('na\\"ive   café'), 'naive cafe')
+
+    def test_near_duplicates(self):
+        entries = [
+            make_entry('a', 'Sparse Graph Networks for Robust Estimation', 'Doe, J. and Roe, R.', '2000'),
+            make_entry('b', 'Quantum Dynamics of Random Systems', 'Chen, L.', '1999'),
+            make_entry('a2', 'Sparse graph networks for robust estimation.', 'J. Doe and R. Roe', '2000'),
+            make_entry('c', 'Optimal Control Theory', 'Garcia, M.', '2010'),
+            make_entry('a3', 'Sparse {G}raph {N}etworks for {R}obust {E}stimation', 'Doe, John', '2001'),
+        ]
+        clusters = DuplicateFinder().find(entries)
+        self.assertEqual([positions for positions, score in clusters], [[0, 2, 4]])
+        self.assertGreaterEqual(clusters[0][1], 0.8)
+
+    def test_same_result_in_every_process(self):
+        # hash() of strings differs between processes, the clusters must not
+        results = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            output = subprocess.run([sys.executable, '-c', script], cwd=root, env=env, stdout=subprocess.PIPE,
+                                    check=True, universal_newlines=True).stdout
+            results.add(output)
+        self.assertEqual(len(results), 1)
+        self.assertNotEqual(results.pop().strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
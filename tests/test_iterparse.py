@@ -0,0 +1,91 @@
+import io
+import random
+import unittest
+from BibtexParser import BibtexParser
+from BibtexTokenizer import BibtexTokenizer
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+class TestIterparse(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.text = sample + make_bib(200)
+        self.filename = self.folder.write('references.bib', self.text)
+        bibtex = BibtexParser()
+        bibtex.parse(self.filename)
+        self.expected = as_tuples(bibtex.entries)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_sample(self):
+        bibtex = BibtexParser()
+        bibtex.parse(self.folder.write('sample.bib', sample))
+        self.assertEqual([entry.key for entry in bibtex], ['Doe2000', 'M\u00fcller1999', 'empty', 'brace_on_next_line', 'long'])
+        self.assertEqual(bibtex.get_entry('Doe2000').title, 'On {Nested {Braces}} in {BibTeX}')
+        self.assertEqual(bibtex.get_entry('Doe2000').journal, 'Journal of {Tests}')
+        self.assertEqual(bibtex.get_entry('Doe2000').year, '2000')
+        self.assertEqual(bibtex.get_entry('long').title, 'A title    over two lines')
+        self.assertEqual(bibtex.get_entry('long').abstract, '{{{{{deeply} nested} braces} beyond} max} depth')
+
+    def test_lines_engine(self):
+        # the line parser only reads braced values, so entries with braced values only are compared
+        text = '@article\n{a, title = {x}}\n\n@book  \r\n  {b,\n    title = {{y} z},\n    year = {2000}\n}\n'
+        filename = self.folder.write('braced.bib', text)
+        expected = [('a', 'article', (('title', 'x'),)), ('b', 'book', (('title', '{y} z'), ('year', '2000')))]
+        for engine in ('tokenizer', 'mmap', 'lines'):
+            with self.subTest(engine=engine):
+                bibtex = BibtexParser()
+                bibtex.parse(filename, engine=engine)
+                self.assertEqual(as_tuples(bibtex.entries), expected)
+        bibtex = BibtexParser()
+        bibtex.parse(filename, lazy=True)
+        self.assertEqual(as_tuples(bibtex.entries), expected)
+
+    def test_non_ascii_field_names(self):
+        # \w of bytes only matches ASCII, the binary tokenizer has to keep the same names as the one of str
+        text = '@misc{a, b\u00e9 = {x}, \u00f1 = "y", b\u20ac = {z}, year = 2000}\n'
+        expected = [('a', 'misc', (('b\u00e9', 'x'), ('\u00f1', 'y'), ('year', '2000')))]
+        self.assertEqual(as_tuples(BibtexTokenizer().parse(text)), expected)
+        self.assertEqual(as_tuples(BibtexTokenizer(binary=True).parse(text.encode('utf8'))), expected)
+        rng = random.Random(0)
+        alphabet = list('ab =,{}"\n\t@x1_') + ['\u00e9', '\u20ac', '\u00df', '\u03a9', '\u00b7', '\u2014']
+        for idx in range(400):
+            text = '@misc{k, %s}\n@article{ok, t = {1}}' % ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            with self.subTest(text=text):
+                self.assertEqual(as_tuples(BibtexTokenizer(binary=True).parse(text.encode('utf8'))),
+                                 as_tuples(BibtexTokenizer().parse(text)))
+
+    def test_small_chunks(self):
+        # entries, field values and multi-byte characters are cut by the chunk boundaries
+        for chunk_size in (1, 2, 3, 7, 64, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                entries = BibtexTokenizer().iterparse(io.StringIO(self.text), chunk_size)
+                self.assertEqual(as_tuples(entries), self.expected)
+
+    def test_binary_small_chunks(self):
+        data = self.text.encode('utf8')
+        for chunk_size in (1, 7, 64):
+            with self.subTest(chunk_size=chunk_size):
+                entries = BibtexTokenizer(binary=True).iterparse(io.BytesIO(data), chunk_size)
+                self.assertEqual(as_tuples(entries), self.expected)
+
+    def test_engines(self):
+        for engine in ('tokenizer', 'mmap'):
+            with self.subTest(engine=engine):
+                self.assertEqual(as_tuples(BibtexParser().iterparse(self.filename, engine)), self.expected)
+
+    def test_streams(self):
+        with open(self.filename, 'rb') as file:
+            self.assertEqual(as_tuples(BibtexParser().iterparse(file)), self.expected)
+        with open(self.filename, 'r', encoding='utf8') as file:
+            self.assertEqual(as_tuples(BibtexParser().iterparse(file)), self.expected)
+
+    def test_empty(self):
+        filename = self.folder.write('empty.bib', '')
+        for engine in ('tokenizer', 'mmap'):
+            self.assertEqual(list(BibtexParser().iterparse(filename, engine)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import time
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+
+
+def make_entries(keys):
+    return [BibtexEntry.from_fields(key, 'article', {'title': 'Title of ' + key, 'year': '2000'}) for key in keys]
+
+
+class TestKeyIndex(unittest.TestCase):
+    def setUp(self):
+        self.bibtex = BibtexParser(make_entries(['a', 'b', 'c', 'b']))
+        # builds the index
+        self.assertEqual(self.bibtex.get_index_of_key('c'), 2)
+
+    def test_lookups(self):
+        self.assertEqual(self.bibtex.get_index_of_key('b'), 1)
+        self.assertEqual(self.bibtex.get_index_of_key('x'), -1)
+        self.assertIn('a', self.bibtex)
+        self.assertNotIn('x', self.bibtex)
+        self.assertIs(self.bibtex.get_entry('c'), self.bibtex.entries[2])
+
+    def test_key_edited_in_place(self):
+        self.bibtex.entries[0].key = 'renamed'
+        self.assertIn('renamed', self.bibtex)
+        self.assertNotIn('a', self.bibtex)
+        self.assertIs(self.bibtex.get_entry('renamed'), self.bibtex.entries[0])
+
+    def test_duplicate_key_renamed(self):
+        self.bibtex.entries[1].key = 'other'
+        self.assertEqual(self.bibtex.get_index_of_key('b'), 3)
+        self.assertEqual(self.bibtex.get_index_of_key('other'), 1)
+
+    def test_list_item_assigned(self):
+        # the list keeps its length, so the index has to be dropped
+        other = make_entries(['new'])[0]
+        self.bibtex.entries[1] = other
+        self.bibtex.invalidate_indexes()
+        self.assertIs(self.bibtex.get_entry('new'), other)
+        self.assertEqual(self.bibtex.get_index_of_key('b'), 3)
+
+    def test_list_changed_in_place(self):
+        self.bibtex.entries.reverse()
+        self.bibtex.invalidate_indexes()
+        self.assertEqual(self.bibtex.get_index_of_key('a'), 3)
+        self.bibtex.entries.append(make_entries(['d'])[0])
+        self.assertEqual(self.bibtex.get_index_of_key('d'), 4)
+        del self.bibtex.entries[0]
+        self.assertEqual(self.bibtex.get_index_of_key('d'), 3)
+
+    def test_list_replaced(self):
+        self.bibtex.entries = make_entries(['x', 'y'])
+        self.assertEqual(self.bibtex.get_index_of_key('y'), 1)
+        self.assertNotIn('a', self.bibtex)
+
+    def test_parser_methods(self):
+        self.bibtex.append_entry(make_entries(['d'])[0])
+        self.assertEqual(self.bibtex.get_index_of_key('d'), 4)
+        self.bibtex.add_endtry(make_entries(['a'])[0])
+        self.assertEqual(len(self.bibtex), 5)
+        del self.bibtex['a']
+        self.assertNotIn('a', self.bibtex)
+        self.bibtex.sort_by_key(reverse=True)
+        self.assertEqual(self.bibtex.get_index_of_key('d'), 0)
+
+    def test_key_of_added_entry_renamed(self):
+        entry = make_entries(['e'])[0]
+        self.bibtex.append_entry(entry)
+        entry.key = 'f'
+        self.assertEqual(self.bibtex.get_index_of_key('f'), 4)
+        replacing = make_entries(['f'])[0]
+        self.bibtex.add_endtry(replacing)
+        replacing.key = 'g'
+        self.assertEqual(self.bibtex.get_index_of_key('g'), 4)
+        self.assertNotIn('f', self.bibtex)
+
+    def test_watches_are_dropped(self):
+        # rebuilt indexes and parsers that are gone do not pile up in the entries
+        entry = self.bibtex.entries[0]
+        for idx in range(20):
+            entry.key = 'a'
+            self.bibtex.get_index_of_key('a')
+            BibtexParser(self.bibtex.entries[:2]).get_index_of_key('a')
+            self.bibtex.invalidate_indexes()
+            self.bibtex.get_index_of_key('a')
+        self.assertLessEqual(len(entry._watches), 2)
+
+    def test_misses_scale_linearly(self):
+        # adding n new keys has to take linear time, not n lookups of O(n) each
+        def add(count):
+            bibtex = BibtexParser(make_entries(['old%d' % idx for idx in range(count)]))
+            entries = make_entries(['new%d' % idx for idx in range(count)])
+            start = time.perf_counter()
+            bibtex.add_entries(entries, replace=True)
+            self.assertNotIn('missing', bibtex)
+            self.assertEqual(len(bibtex), 2 * count)
+            return time.perf_counter() - start
+        small = min(add(5000) for _ in range(3))
+        large = min(add(40000) for _ in range(3))
+        self.assertLess(large, 24 * small)
+
+
+if __name__ == '__main__':
+    unittest.main()
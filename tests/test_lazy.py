@@ -0,0 +1,52 @@
+import pickle
+import unittest
+from BibtexLazy import parse_lazy
+from BibtexParser import BibtexParser
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.filename = self.folder.write('references.bib', sample + make_bib(100))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def parse(self, lazy):
+        bibtex = BibtexParser()
+        bibtex.parse(self.filename, lazy=lazy)
+        return bibtex
+
+    def test_fields_equal_eager_parse(self):
+        lazy = self.parse(True)
+        self.assertFalse(any(entry.is_loaded() for entry in lazy))
+        self.assertEqual(as_tuples(lazy), as_tuples(self.parse(False)))
+
+    def test_unchanged_entries_are_written_verbatim(self):
+        lazy = self.parse(True)
+        with open(self.filename, 'r', encoding='utf8') as file:
+            text = file.read()
+        for entry in lazy:
+            self.assertIn(entry.verbatim(), text)
+        lazy.entries[0].key = 'renamed'
+        lazy.entries[1].set_field('year', '1900')
+        self.assertIsNone(lazy.entries[0].verbatim())
+        self.assertIsNone(lazy.entries[1].verbatim())
+        output = self.folder.write('output.bib', '')
+        lazy.write(output)
+        written = BibtexParser()
+        written.parse(output)
+        self.assertEqual(as_tuples(written), as_tuples(lazy))
+
+    def test_str_buffer_and_pickle(self):
+        entries = list(parse_lazy(sample))
+        self.assertEqual(entries[1].key, 'Müller1999')
+        self.assertEqual(entries[1].title, 'Straße')
+        self.assertNotIn('\r', entries[1].verbatim())
+        copies = pickle.loads(pickle.dumps(entries))
+        self.assertEqual(as_tuples(copies), as_tuples(entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import io
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexMerge import BibtexMerger, merge
+from BibtexParser import BibtexParser
+from tests.helpers import make_bib, as_tuples, TemporaryFolder
+
+
+def make_entry(key, **fields):
+    return BibtexEntry.from_fields(key, 'misc', fields)
+
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.sources = [
+            BibtexParser([make_entry('a', title='A1'), make_entry('b', title='B1')]),
+            BibtexParser([make_entry('b', year='2000'), make_entry('c', title='C2')]),
+            BibtexParser([make_entry('c', title='C3', note='n'), make_entry('a', title='A3', year='1999')]),
+        ]
+
+    def test_policies(self):
+        self.assertEqual(as_tuples(merge(self.sources, 'first')), [
+            ('a', 'misc', (('title', 'A1'),)), ('b', 'misc', (('title', 'B1'),)), ('c', 'misc', (('title', 'C2'),))])
+        self.assertEqual(as_tuples(merge(self.sources, 'last')), [
+            ('a', 'misc', (('title', 'A3'), ('year', '1999'))), ('b', 'misc', (('year', '2000'),)),
+            ('c', 'misc', (('title', 'C3'), ('note', 'n')))])
+        self.assertEqual(as_tuples(merge(self.sources, 'union')), [
+            ('a', 'misc', (('title', 'A1'), ('year', '1999'))), ('b', 'misc', (('title', 'B1'), ('year', '2000'))),
+            ('c', 'misc', (('title', 'C2'), ('note', 'n')))])
+
+    def test_iter_merge_matches_merge(self):
+        for policy in ('first', 'last', 'union'):
+            with self.subTest(policy=policy):
+                merger = BibtexMerger(policy)
+                streamed = as_tuples(merger.iter_merge(self.sources))
+                collisions = merger.collisions
+                self.assertEqual(streamed, as_tuples(merger.merge(self.sources)))
+                self.assertEqual(collisions, merger.collisions)
+                self.assertEqual(collisions, {'a': [0, 2], 'b': [0, 1], 'c': [1, 2]})
+
+    def test_files(self):
+        folder = TemporaryFolder()
+        try:
+            filenames = [folder.write('part%d.bib' % idx, make_bib(50, seed=idx)) for idx in range(3)]
+            for policy in ('first', 'last', 'union'):
+                with self.subTest(policy=policy):
+                    merger = BibtexMerger(policy)
+                    output = folder.write('merged.bib', '')
+                    merger.write(filenames, output)
+                    written = BibtexParser()
+                    written.parse(output)
+                    self.assertEqual(as_tuples(written), as_tuples(merger.merge(filenames)))
+        finally:
+            folder.cleanup()
+
+    def test_streams_need_first(self):
+        with self.assertRaises(ValueError):
+            list(BibtexMerger('last').iter_merge([io.StringIO('@misc{a, title = {A}}')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
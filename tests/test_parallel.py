@@ -0,0 +1,50 @@
+import unittest
+import BibtexParallel
+from BibtexParallel import parse_parallel
+from BibtexParser import BibtexParser
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+class TestParseParallel(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.min_chunk_size = BibtexParallel.min_chunk_size
+        # chunks of a few dozen bytes, so that nearly every entry is cut by a chunk boundary
+        BibtexParallel.min_chunk_size = 1
+
+    def tearDown(self):
+        BibtexParallel.min_chunk_size = self.min_chunk_size
+        self.folder.cleanup()
+
+    def check(self, text: str):
+        filename = self.folder.write('references.bib', text)
+        bibtex = BibtexParser()
+        bibtex.parse(filename)
+        expected = as_tuples(bibtex.entries)
+        for workers, chunks_per_worker in ((2, 1), (2, 50), (3, 200)):
+            with self.subTest(workers=workers, chunks_per_worker=chunks_per_worker):
+                self.assertEqual(as_tuples(parse_parallel(filename, workers, chunks_per_worker)), expected)
+
+    def test_random_entries(self):
+        self.check(sample + make_bib(300, seed=1))
+
+    def test_entries_containing_at_signs(self):
+        # chunks starting inside a value that looks like the start of an entry
+        self.check(''.join('@misc{k%d, note = {x @article{fake%d, title = {y}} z}, year = {%d}}\n' % (idx, idx, idx)
+                           for idx in range(200)))
+
+    def test_small_files(self):
+        self.check('')
+        self.check('@misc{only, title = {one}}')
+        self.check('no entries at all')
+
+    def test_parse_workers(self):
+        filename = self.folder.write('references.bib', make_bib(100))
+        serial, parallel = BibtexParser(), BibtexParser()
+        serial.parse(filename)
+        parallel.parse(filename, workers=2)
+        self.assertEqual(as_tuples(parallel.entries), as_tuples(serial.entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexLazy import parse_lazy
+from BibtexParser import BibtexParser
+from BibtexPipeline import BibtexPipeline
+from tests.helpers import sample, as_tuples
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.entries = [
+            BibtexEntry.from_fields('a', 'article', {'abstract': 'Text', 'title': 'A & B', 'url': '\\url{https://example.org/?a=1&b=2}'}),
+            BibtexEntry.from_fields('b', 'misc', {'title': '100%', 'year': '2000'}),
+        ]
+
+    def test_unchanged_entries_are_left_alone(self):
+        fields = self.entries[1].fields
+        BibtexParser(self.entries).set_field_last('abstract')
+        self.assertIs(self.entries[1].fields, fields)
+        self.assertEqual(list(self.entries[0].fields), ['title', 'url', 'abstract'])
+
+    def test_fields_handed_out_stay_attached(self):
+        fields = self.entries[0].fields
+        BibtexParser(self.entries).set_field_last('abstract')
+        self.assertIs(self.entries[0].fields, fields)
+        self.assertEqual(list(fields), ['title', 'url', 'abstract'])
+
+    def test_lazy_entries_keep_their_source(self):
+        entries = list(parse_lazy(sample))
+        BibtexPipeline().set_field_last('nonexistent').fix_special_characters(fields=['year']).apply(BibtexParser(entries))
+        self.assertTrue(all(entry.verbatim() is not None for entry in entries))
+        BibtexPipeline().set_field_last('title').apply(BibtexParser(entries))
+        self.assertIsNone(entries[0].verbatim())
+
+    def test_fix_special_characters(self):
+        copies = [entry.__deepcopy__() for entry in self.entries]
+        BibtexPipeline().fix_special_characters(only_if_url_or_href=True).apply(BibtexParser(self.entries))
+        for entry in copies:
+            entry.fix_special_characters(only_if_url_or_href=True)
+        self.assertEqual(as_tuples(self.entries), as_tuples(copies))
+        self.assertEqual(self.entries[0].url, '\\url{https://example.org/?a=1\\&b=2}')
+        self.assertEqual(self.entries[0].title, 'A & B')
+
+    def test_matches_the_entry_methods(self):
+        copies = [entry.__deepcopy__() for entry in self.entries if entry.type != 'misc']
+        for entry in copies:
+            entry.use_url_in_title_as_href()
+            entry.set_order_of_fields(['year', 'title'])
+            entry.fix_special_characters()
+        pipeline = BibtexPipeline().use_url_in_title_as_href().set_order_of_fields(['year', 'title']) \
+            .fix_special_characters().remove_entries_with_type('misc')
+        self.assertEqual(as_tuples(pipeline.iterate(self.entries)), as_tuples(copies))
+
+
+if __name__ == '__main__':
+    unittest.main()
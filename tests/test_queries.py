@@ -0,0 +1,95 @@
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from BibtexPipeline import BibtexPipeline
+from BibtexQuery import YearEquals, TypeEquals, AuthorContains
+
+
+def make_entry(key, entry_type, year, author):
+    return BibtexEntry.from_fields(key, entry_type, {'author': author, 'title': 'Title of ' + key, 'year': year})
+
+
+class TestQueries(unittest.TestCase):
+    def setUp(self):
+        self.bibtex = BibtexParser([
+            make_entry('a', 'article', '2000', 'Doe, J.'),
+            make_entry('b', 'Book', '2001', 'Roe, R. and Doe, J.'),
+            make_entry('c', 'article', '2001', 'Chen, L.'),
+        ])
+
+    def keys(self, bibtex):
+        return [entry.key for entry in bibtex]
+
+    def test_queries(self):
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b', 'c'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_type('book')), ['b'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_author('Doe')), ['a', 'b'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_where_content_is_in_field('itle of', 'title')), ['a', 'b', 'c'])
+        self.assertEqual(self.keys(self.bibtex.query(YearEquals(2001) & (TypeEquals('article') | AuthorContains('Roe')))), ['b', 'c'])
+
+    def test_field_set_directly(self):
+        self.assertEqual(len(self.bibtex.get_entries_in_year(3000)), 0)
+        self.bibtex.entries[0].set_field('year', '3000')
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(3000)), ['a'])
+        self.bibtex.entries[1].fields['year'] = '3000'
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(3000)), ['a', 'b'])
+        del self.bibtex.entries[1].fields['author']
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_author('Doe')), ['a'])
+
+    def test_type_set_directly(self):
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_type('article')), ['a', 'c'])
+        self.bibtex.entries[0].type = 'misc'
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_type('article')), ['c'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_type('misc')), ['a'])
+
+    def test_list_item_assigned(self):
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(1999)), [])
+        self.bibtex.entries[2] = make_entry('d', 'article', '1999', 'Doe, J.')
+        # the list keeps its length, so the index has to be dropped
+        self.bibtex.invalidate_indexes()
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(1999)), ['d'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_author('Chen')), [])
+
+    def test_fields_handed_out_before_indexing(self):
+        fields = self.bibtex.entries[2].fields
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b', 'c'])
+        fields['year'] = '2002'
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b'])
+        # an entry sharing its fields with a copy
+        copy = self.bibtex.entries[0].__copy__()
+        self.bibtex.entries[0] = copy
+        self.bibtex.invalidate_indexes()
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2000)), ['a'])
+        copy.fields['year'] = '1990'
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2000)), [])
+
+    def test_other_parsers_keep_their_index(self):
+        self.bibtex.get_entries_in_year(2001)
+        index = self.bibtex._field_index
+        other = BibtexParser([make_entry('x', 'article', '2001', 'Doe, J.')])
+        other.get_entries_in_year(2001)
+        other.entries[0].set_field('year', '2005')
+        self.assertEqual(self.keys(other.get_entries_in_year(2005)), ['x'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b', 'c'])
+        self.assertIs(self.bibtex._field_index, index)
+
+    def test_list_changed_length(self):
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2000)), ['a'])
+        self.bibtex.entries.append(make_entry('d', 'article', '2000', 'Doe, J.'))
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2000)), ['a', 'd'])
+        del self.bibtex.entries[0]
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2000)), ['d'])
+
+    def test_transformations(self):
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_author('Doe')), ['a', 'b'])
+        self.bibtex.remove_fields(['author'])
+        self.assertEqual(self.keys(self.bibtex.get_entries_with_author('Doe')), [])
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b', 'c'])
+        self.bibtex.sort_by_key(reverse=True)
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['c', 'b'])
+        BibtexPipeline().sort_by_key().apply(self.bibtex)
+        self.assertEqual(self.keys(self.bibtex.get_entries_in_year(2001)), ['b', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import random
+import unittest
+from BibtexEntry import BibtexEntry
+from BibtexParser import BibtexParser
+from BibtexSnapshot import BibtexSnapshot
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+def split_entries(text: str):
+    parts = text.split('\n@')
+    return [parts[0]] + ['@' + part for part in parts[1:]]
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.block_size = BibtexSnapshot.block_size
+        # blocks of a few entries, so that the block hashes are used on small files as well
+        BibtexSnapshot.block_size = 4
+
+    def tearDown(self):
+        BibtexSnapshot.block_size = self.block_size
+        self.folder.cleanup()
+
+    def write(self, text: str):
+        return self.folder.write('references.bib', text)
+
+    def parse(self, filename: str):
+        bibtex = BibtexParser()
+        bibtex.parse(filename)
+        return as_tuples(bibtex.entries)
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        parts = split_entries(sample + make_bib(60, seed=2))
+        filename = self.write(''.join(parts))
+        bibtex = BibtexParser()
+        bibtex.reload(filename)
+        for step in range(400):
+            action = rng.random()
+            idx = rng.randrange(len(parts))
+            if action < 0.3:
+                parts.insert(idx, '\n@misc{added%d,\n    title = {Added %d}\n}' % (step, step))
+            elif action < 0.5 and len(parts) > 1:
+                del parts[idx]
+            elif action < 0.8:
+                # edits a single character, possibly a brace or the @ of an entry
+                part = parts[idx]
+                pos = rng.randrange(len(part) + 1)
+                parts[idx] = part[:pos] + rng.choice(['x', '{', '}', '@', ',', '\n', '']) + part[pos + 1:]
+            else:
+                parts[idx], parts[-1] = parts[-1], parts[idx]
+            before = {id(entry): entry for entry in bibtex.entries}
+            text = ''.join(parts)
+            filename = self.write(text)
+            added, changed, removed = bibtex.reload()
+            with self.subTest(step=step):
+                self.assertEqual(as_tuples(bibtex.entries), self.parse(filename))
+                kept = [entry for entry in bibtex.entries if id(entry) in before]
+                self.assertEqual(len(kept) + len(added) + len(changed), len(bibtex.entries))
+                self.assertEqual(len(before) - len(kept), len(changed) + len(removed))
+
+    def test_reload_after_parse(self):
+        filename = self.write(make_bib(20))
+        bibtex = BibtexParser()
+        bibtex.parse(filename)
+        entries = list(bibtex.entries)
+        with open(filename, 'a', encoding='utf8') as file:
+            file.write('@misc{new,\n    title = {New}\n}\n')
+        added, changed, removed = bibtex.reload()
+        self.assertEqual([entry.key for entry in added], ['new'])
+        self.assertEqual((changed, removed), ([], []))
+        self.assertTrue(all(new is old for new, old in zip(bibtex.entries, entries)))
+        self.assertEqual(as_tuples(bibtex.entries), self.parse(filename))
+
+    def test_entries_of_the_parser_are_kept(self):
+        filename = self.write('@misc{a, title = {A}}\n@misc{b, title = {B}}\n@misc{c, title = {C}}\n')
+        bibtex = BibtexParser()
+        bibtex.parse(filename)
+        own = BibtexEntry.from_fields('own', 'misc', {'title': 'Own'})
+        bibtex.append_entry(own)
+        del bibtex['c']
+        self.write('@misc{a, title = {A}}\n@misc{b, title = {B2}}\n@misc{b2, title = {New}}\n@misc{c, title = {C}}\n')
+        added, changed, removed = bibtex.reload()
+        self.assertEqual([entry.key for entry in bibtex], ['a', 'b', 'b2', 'own'])
+        self.assertEqual(bibtex.get_entry('b').title, 'B2')
+        self.assertIs(bibtex.get_entry('own'), own)
+        self.assertEqual(([entry.key for entry in added], [entry.key for entry in changed], removed), (['b2'], ['b'], []))
+
+    def test_empty_file(self):
+        filename = self.write(make_bib(5))
+        bibtex = BibtexParser()
+        bibtex.reload(filename)
+        self.write('')
+        added, changed, removed = bibtex.reload()
+        self.assertEqual((len(bibtex), len(added), len(changed), len(removed)), (0, 0, 0, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import json
+import unittest
+import BibtexParallel
+from BibtexCache import BibtexCache
+from BibtexParser import BibtexParser
+from BibtexStats import BibtexStats
+from tests.helpers import sample, make_bib, as_tuples, TemporaryFolder
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryFolder()
+        self.filename = self.folder.write('references.bib', sample + make_bib(50))
+        bibtex = BibtexParser()
+        bibtex.parse(self.filename)
+        self.expected = as_tuples(bibtex.entries)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def parse(self, **kwargs):
+        bibtex = BibtexParser()
+        stats = bibtex.enable_stats()
+        bibtex.parse(self.filename, **kwargs)
+        return bibtex, stats
+
+    def test_counters(self):
+        bibtex, stats = self.parse()
+        self.assertEqual(stats.counters['bytes_read'], os.path.getsize(self.filename))
+        self.assertEqual(stats.counters['entries_parsed'], len(self.expected))
+        self.assertEqual(stats.counters['fields_parsed'], sum(len(fields) for _, _, fields in self.expected))
+        self.assertGreater(stats.counters['regex_calls'], len(self.expected))
+        self.assertIn('read', stats.seconds)
+        self.assertIn('tokenize', stats.seconds)
+        bibtex.write(os.path.join(self.folder.path, 'written.bib'))
+        self.assertEqual(stats.counters['entries_written'], len(self.expected))
+        data = json.loads(stats.to_json())
+        self.assertEqual(data['counters']['entries_parsed'], len(self.expected))
+        self.assertIn('entries_per_second', data['rates'])
+        self.assertIn('entries_written_per_second', data['rates'])
+
+    def test_hooks(self):
+        bibtex = BibtexParser()
+        stats = bibtex.enable_stats()
+        entries, files = [], []
+        stats.add_entry_hook(lambda entry, phase: entries.append((entry.key, phase)))
+        stats.add_file_hook(lambda filename, phase: files.append((filename, phase)))
+        bibtex.parse(self.filename)
+        written = os.path.join(self.folder.path, 'written.bib')
+        bibtex.write(written)
+        keys = [key for key, _, _ in self.expected]
+        self.assertEqual(entries, [(key, 'parse') for key in keys] + [(key, 'write') for key in keys])
+        self.assertEqual(files, [(self.filename, 'parse'), (written, 'write')])
+
+    def test_engines_count_regex_calls(self):
+        for kwargs in ({}, {'engine': 'mmap'}, {'lazy': True}, {'workers': 2}):
+            with self.subTest(**kwargs):
+                bibtex, stats = self.parse(**kwargs)
+                self.assertGreater(stats.counters['regex_calls'], 0)
+                self.assertEqual(as_tuples(bibtex.entries), self.expected)
+
+    def test_lazy_fields_count_when_loaded(self):
+        bibtex, stats = self.parse(lazy=True)
+        calls = stats.counters['regex_calls']
+        self.assertEqual(stats.counters['fields_parsed'], 0)
+        bibtex.entries[0].fields
+        self.assertGreater(stats.counters['regex_calls'], calls)
+
+    def test_parallel_chunks_count_regex_calls(self):
+        min_chunk_size = BibtexParallel.min_chunk_size
+        BibtexParallel.min_chunk_size = 1
+        try:
+            bibtex, stats = self.parse(workers=3)
+        finally:
+            BibtexParallel.min_chunk_size = min_chunk_size
+        self.assertEqual(as_tuples(bibtex.entries), self.expected)
+        # every chunk tokenizes at least one entry
+        self.assertGreater(stats.counters['regex_calls'], len(self.expected))
+
+    def test_cache(self):
+        cache = BibtexCache(os.path.join(self.folder.path, 'cache'))
+        _, stats = self.parse(cache=cache)
+        self.assertEqual(stats.counters['cache_misses'], 1)
+        self.assertGreater(stats.counters['regex_calls'], 0)
+        _, stats = self.parse(cache=cache)
+        self.assertEqual(stats.counters['cache_hits'], 1)
+        self.assertEqual(stats.counters['regex_calls'], 0)
+
+    def test_shared_and_disabled(self):
+        stats = BibtexStats()
+        for _ in range(2):
+            bibtex = BibtexParser()
+            self.assertIs(bibtex.enable_stats(stats), stats)
+            bibtex.parse(self.filename)
+        self.assertEqual(stats.counters['entries_parsed'], 2 * len(self.expected))
+        bibtex.disable_stats()
+        self.assertIs(bibtex.tokenizer, BibtexParser.tokenizer)
+        self.assertIs(bibtex.binary_tokenizer, BibtexParser.binary_tokenizer)
+        stats.reset()
+        bibtex.parse(self.filename)
+        self.assertEqual(stats.counters, {})
+
+
+if __name__ == '__main__':
+    unittest.main()